@@ -6,16 +6,23 @@ load_dotenv()
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
     CallbackQueryHandler,
     ContextTypes,
     CommandHandler,
 )
 
-from src.exceptions import BotException
+from src.exceptions import BotException, RequestSuperseded
+from src.executor import executor
 from src.logging import log_command
-from src.session import sessions
+from src.metrics import start_metrics_server
+from src.session import sessions, strategies
 from src.strategy import *
+from src.trace import span
+from src.webhook import BOT_WORKERS, serve_webhook
+
+BOT_MODE = os.getenv("BOT_MODE") or "polling"
 
 
 @log_command
@@ -37,51 +44,74 @@ async def suggest_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    session = sessions.get(update.effective_user.id, update.effective_chat.id)
-
-    # Register new guesses
+    guesses = []
     for line in lines[1:]:
         line = line.strip()
         match = re.match(r"^([a-zA-Z]{5}): ([012]{5})$", line)
         if not match:
             raise BotException(f"Invalid format: {line}")
-
-        guess, raw_result = match.groups()
-        session.add_guess(guess, raw_result)
-
-    # Check for win
-    if session.is_won():
-        guess_count = len(session.guesses)
-        sessions.reset(update.effective_user.id, update.effective_chat.id)
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=f"🎉 You won in {guess_count}/6 guesses!",
-        )
-        return
-
-    # Check for game over
-    if session.is_complete():
-        sessions.reset(update.effective_user.id, update.effective_chat.id)
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="Game over! You've used all 6 guesses. Use /newgame to start again.",
-        )
-        return
-
-    # Build history display
-    history_lines = []
-    for g in session.guesses:
-        result_display = "".join(
-            "⬜️" if c == "0" else "🟩" if c == "1" else "🟨" for c in g.result
-        )
-        history_lines.append(f"{result_display}  {g.word}")
-
-    suggestions = session.strategy.execute(guesses=session.guesses, n=3)
-    suggestions_text = ", ".join(suggestions)
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text="\n".join(history_lines) + f"\n\nTry: {suggestions_text}",
-    )
+        guesses.append(match.groups())
+
+    # Replies with the longest history, so earlier suggestions are stale
+    async with sessions.turn(
+        update.effective_user.id, update.effective_chat.id, supersede=True
+    ) as turn:
+        session = turn.session
+
+        # Register new guesses
+        try:
+            with span("narrow_candidates"):
+                for guess, raw_result in guesses:
+                    session.add_guess(guess, raw_result)
+        finally:
+            sessions.save(update.effective_user.id, update.effective_chat.id)
+
+        # Check for win
+        if session.is_won():
+            guess_count = len(session.guesses)
+            await sessions.reset(update.effective_user.id, update.effective_chat.id)
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text=f"🎉 You won in {guess_count}/6 guesses!",
+            )
+            return
+
+        # Check for game over
+        if session.is_complete():
+            await sessions.reset(update.effective_user.id, update.effective_chat.id)
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="Game over! You've used all 6 guesses. Use /newgame to start again.",
+            )
+            return
+
+        # Build history display
+        history_lines = []
+        for g in session.guesses:
+            result_display = "".join(
+                "⬜️" if c == "0" else "🟩" if c == "1" else "🟨" for c in g.result
+            )
+            history_lines.append(f"{result_display}  {g.word}")
+
+        try:
+            suggestions = await turn.supersedable(
+                executor.execute(
+                    session.strategy,
+                    guesses=session.guesses,
+                    n=3,
+                    candidates=session.candidates,
+                )
+            )
+        except RequestSuperseded:
+            # A newer request for this chat replies with the longer history
+            return
+
+        suggestions_text = ", ".join(suggestions)
+        with span("telegram_send"):
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="\n".join(history_lines) + f"\n\nTry: {suggestions_text}",
+            )
 
 
 @log_command
@@ -116,15 +146,17 @@ async def strategy_callback_handler(update: Update, context: ContextTypes.DEFAUL
 
     await query.answer()
 
-    session = sessions.get(update.effective_user.id, update.effective_chat.id)
-
-    if query.data == "strategy_entropy":
-        session.strategy = EntropyStrategy()
-    elif query.data == "strategy_minimax":
-        session.strategy = MinimaxStrategy()
-    else:
+    strategy = strategies.get(query.data.removeprefix("strategy_"))
+    if strategy is None:
         raise BotException(f"Unknown strategy: {query.data}")
 
+    async with sessions.turn(
+        update.effective_user.id, update.effective_chat.id
+    ) as turn:
+        session = turn.session
+        session.set_strategy(strategy)
+        sessions.save(update.effective_user.id, update.effective_chat.id)
+
     await query.edit_message_text(
         text=(
             f"You selected: {session.strategy.name}\n" f"Your session has been updated."
@@ -141,9 +173,13 @@ async def newgame_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ):
         return
 
-    session = sessions.get(update.effective_user.id, update.effective_chat.id)
-    previous_count = len(session.guesses)
-    session.reset()
+    async with sessions.turn(
+        update.effective_user.id, update.effective_chat.id
+    ) as turn:
+        session = turn.session
+        previous_count = await sessions.reset(
+            update.effective_user.id, update.effective_chat.id
+        )
 
     if previous_count > 0:
         await context.bot.send_message(
@@ -175,6 +211,36 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
+async def post_init(application: Application):
+    await sessions.start()
+
+
+async def post_stop(application: Application):
+    # Persists sessions still waiting to be written
+    await sessions.close()
+
+
+def build_application(bot_token: str, updater: bool = True) -> Application:
+    """Build the bot application with every handler registered."""
+    builder = ApplicationBuilder().token(bot_token)
+    builder = builder.post_init(post_init).post_stop(post_stop)
+    # Handle chats in parallel; sessions.turn() keeps each chat's in order
+    builder = builder.concurrent_updates(True)
+    if not updater:
+        # Updates are fed in by the webhook front process instead
+        builder = builder.updater(None)
+
+    application = builder.build()
+    application.add_handler(CommandHandler("suggest", suggest_handler))
+    application.add_handler(CommandHandler("newgame", newgame_handler))
+    application.add_handler(CommandHandler("strategy", strategy_handler))
+    application.add_handler(
+        CallbackQueryHandler(strategy_callback_handler, pattern="^strategy_")
+    )
+    application.add_error_handler(error_handler)
+    return application
+
+
 def main():
     print("Beginning bot intialization...")
 
@@ -184,23 +250,32 @@ def main():
         raise ValueError("Telegram bot token not found")
     print("Token successfully fetched.")
 
+    if BOT_MODE == "webhook":
+        print(f"Starting webhook front and {BOT_WORKERS} bot workers...")
+        serve_webhook(bot_token, build_application)
+        print("Bot successfully shutdown.")
+        return
+    if BOT_MODE != "polling":
+        raise ValueError(f"Unknown bot mode: {BOT_MODE}")
+
     print("Registering handlers...")
-    application = ApplicationBuilder().token(bot_token).build()
-    application.add_handler(CommandHandler("suggest", suggest_handler))
-    application.add_handler(CommandHandler("newgame", newgame_handler))
-    application.add_handler(CommandHandler("strategy", strategy_handler))
-    application.add_handler(
-        CallbackQueryHandler(strategy_callback_handler, pattern="^strategy_")
-    )
-    application.add_error_handler(error_handler)
+    application = build_application(bot_token)
     print("Handlers successfully registered.")
 
+    print("Starting strategy workers...")
+    executor.start(list(strategies.values()))
+    print("Strategy workers successfully started.")
+
+    if start_metrics_server() is not None:
+        print("Metrics endpoint successfully started.")
+
     print("Bot successfully initialized.")
 
     try:
         print("Starting bot...")
         application.run_polling()
     finally:
+        executor.shutdown()
         print("Bot successfully shutdown.")
 
 
@@ -0,0 +1,416 @@
+"""
+Benchmark strategies by simulating games against a wordlist's answers.
+
+Run from the repository root:
+    python -m scripts.benchmark entropy minimax:depth=0,prune_k=50 --games 200
+    python -m scripts.benchmark entropy --output baseline.json
+    python -m scripts.benchmark entropy --baseline baseline.json
+    python -m scripts.benchmark minimax:depth=2,prune_k=10 --check --games 50
+
+With --check, each strategy is first checked against slow reference
+implementations: the pattern matrix against get_feedback_pattern, and for
+Minimax the pruned search against an exhaustive one over the same
+candidates. Any mismatch fails the run.
+
+Each strategy spec is a strategy name with optional constructor arguments,
+e.g. "minimax:depth=1,prune_k=20,time_budget=none". Every spec runs in a
+fresh process, so its caches start empty and its peak memory is its own.
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import fsum, log2
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from src.simulation import MAX_GUESSES, latency_summary, make_strategy, play_game
+from src.strategy.base import Strategy
+from src.strategy.book import opening_book
+from src.strategy.cache import result_cache
+from src.strategy.minimax import MinimaxStrategy, candidate_table, expected_table
+from src.strategy.patterns import (
+    SOLVED_PATTERN,
+    build_pattern_matrix,
+    encode_pattern,
+    get_feedback_pattern,
+    wordlist_hash,
+)
+from src.trace import Trace, tracing
+from src.wordlist import load_wordlist
+
+BENCHMARK_FORMAT_VERSION = 1
+
+# Metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    ("latency_ms", "p50"): False,
+    ("latency_ms", "p90"): False,
+    ("latency_ms", "p99"): False,
+    ("peak_rss_mb",): False,
+    ("mean_guesses",): False,
+    ("solve_rate",): True,
+    ("guess_pool", "mean_out"): False,
+}
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(peak * scale / 2**20, 1)
+
+
+def _clear_caches() -> None:
+    result_cache.clear()
+    expected_table.clear()
+    candidate_table.clear()
+
+
+def _guess_pool_summary(trace: Trace) -> dict[str, Any]:
+    """Summarize how much guess-pool reduction shrank the guesses scored."""
+    calls = trace.counters.get("guess_pool_calls", 0)
+    if not calls:
+        return {"calls": 0}
+    guesses_in = trace.counters["guess_pool_in"]
+    guesses_out = trace.counters["guess_pool_out"]
+    return {
+        "calls": int(calls),
+        "mean_in": round(guesses_in / calls, 1),
+        "mean_out": round(guesses_out / calls, 1),
+        "kept": round(guesses_out / guesses_in, 4),
+    }
+
+
+# Guesses and answers compared against get_feedback_pattern one by one
+_CHECKED_GUESSES = 300
+_CHECKED_ANSWERS = 2000
+# Positions, and the most answers in one, checked against an exhaustive search
+_CHECKED_POSITIONS = 20
+_CHECKED_POSITION_SIZE = 150
+
+
+def _check_patterns(strategy: Strategy, rng: np.random.Generator) -> list[str]:
+    """Compare pattern codes, loaded and freshly built, with the reference."""
+    words = strategy.words
+    guesses = sorted(rng.choice(len(words), min(_CHECKED_GUESSES, len(words))))
+    answers = sorted(rng.choice(len(words), min(_CHECKED_ANSWERS, len(words))))
+    built = build_pattern_matrix(
+        [words[g] for g in guesses], [words[a] for a in answers]
+    )
+
+    failures = []
+    for row, guess in enumerate(guesses):
+        for column, answer in enumerate(answers):
+            expected = encode_pattern(get_feedback_pattern(words[guess], words[answer]))
+            for source, code in [
+                ("loaded", strategy.patterns[guess, answer]),
+                ("built", built[row, column]),
+            ]:
+                if code != expected:
+                    failures.append(
+                        f"{source} pattern {words[guess]}/{words[answer]}: "
+                        f"{code}, expected {expected}"
+                    )
+    return failures
+
+
+def _exhaustive_expected(
+    strategy: MinimaxStrategy, possible_answers: np.ndarray, depth: int
+) -> float:
+    """MinimaxStrategy._expected_guesses without bounds or tables."""
+    if len(possible_answers) <= 1:
+        return len(possible_answers)
+    if depth == 0:
+        return log2(len(possible_answers))
+    candidates = strategy._get_top_entropy_candidates(
+        possible_answers, strategy.prune_k, in_search=True
+    )
+    return min(
+        _exhaustive_expected_for_guess(strategy, candidate, possible_answers, depth - 1)
+        for candidate in candidates
+    )
+
+
+def _exhaustive_expected_for_guess(
+    strategy: MinimaxStrategy, guess: int, possible_answers: np.ndarray, depth: int
+) -> float:
+    total = len(possible_answers)
+    terms = []
+    for pattern, group in strategy._group_by_pattern(guess, possible_answers).items():
+        probability = len(group) / total
+        if pattern == SOLVED_PATTERN:
+            terms.append(probability)
+        else:
+            expected = _exhaustive_expected(strategy, group, depth)
+            terms.append(probability * (1 + expected))
+    return fsum(terms)
+
+
+def _check_search(
+    strategy: MinimaxStrategy, rng: np.random.Generator, n: int
+) -> list[str]:
+    """Compare the pruned search's top n with an exhaustive search's."""
+    words = strategy.words
+    # Positions after one random guess, as a real game would reach
+    positions: list[np.ndarray] = []
+    while len(positions) < _CHECKED_POSITIONS:
+        guess = int(rng.integers(len(words)))
+        groups = strategy._group_by_pattern(guess, np.arange(len(words)))
+        for group in groups.values():
+            if 2 <= len(group) <= _CHECKED_POSITION_SIZE:
+                positions.append(group)
+
+    failures = []
+    for possible_answers in positions[:_CHECKED_POSITIONS]:
+        suggestions = strategy._rank(possible_answers, n)
+
+        sampled = strategy._sample_answers(possible_answers)
+        candidates = strategy._get_top_entropy_candidates(sampled, strategy.prune_k)
+        possible = set(possible_answers.tolist())
+        # Ties keep entropy order, as in the search's own ranking
+        scored = sorted(
+            (
+                _exhaustive_expected_for_guess(
+                    strategy, candidate, sampled, strategy.depth
+                ),
+                candidate not in possible,
+                order,
+            )
+            for order, candidate in enumerate(candidates)
+        )
+        expected = [words[candidates[order]] for _, _, order in scored[:n]]
+        if suggestions != expected:
+            failures.append(
+                f"search over {len(possible_answers)} answers: {suggestions}, "
+                f"expected {expected}"
+            )
+    return failures
+
+
+def run_checks(
+    spec: str, filename: str, max_words: Optional[int], n: int, seed: int
+) -> list[str]:
+    """Check a strategy against the reference implementations; return failures."""
+    strategy = make_strategy(spec, filename=filename, max_words=max_words)
+    rng = np.random.default_rng(seed)
+
+    failures = _check_patterns(strategy, rng)
+    if isinstance(strategy, MinimaxStrategy):
+        # The full depth is compared, so no time budget may cut it short
+        strategy.time_budget = None
+        failures += _check_search(strategy, rng, n)
+    return failures
+
+
+def run_benchmark(
+    spec: str,
+    filename: str,
+    max_words: Optional[int],
+    answers: list[str],
+    n: int,
+    cold: bool,
+) -> dict[str, Any]:
+    """Play every answer with one strategy and summarize the results."""
+    start = time.perf_counter()
+    strategy = make_strategy(spec, filename=filename, max_words=max_words)
+    setup_seconds = time.perf_counter() - start
+
+    if cold:
+        opening_book.lines.clear()
+
+    move_seconds: list[float] = []
+    move_seconds_by_move: dict[int, list[float]] = {}
+    distribution = {str(count): 0 for count in range(1, MAX_GUESSES + 1)}
+    distribution["X"] = 0
+    solved_guesses: list[int] = []
+
+    start = time.perf_counter()
+    # Collects counters such as the guess-pool sizes over every game
+    with tracing(True) as trace:
+        for answer in answers:
+            if cold:
+                _clear_caches()
+            game = play_game(strategy, answer, n=n)
+
+            move_seconds.extend(game.move_seconds)
+            for move, seconds in enumerate(game.move_seconds, start=1):
+                move_seconds_by_move.setdefault(move, []).append(seconds)
+            if game.solved:
+                distribution[str(len(game.guesses))] += 1
+                solved_guesses.append(len(game.guesses))
+            else:
+                distribution["X"] += 1
+    total_seconds = time.perf_counter() - start
+    assert trace is not None
+
+    return {
+        "strategy": spec,
+        "config": strategy.config,
+        "games": len(answers),
+        "solve_rate": round(len(solved_guesses) / len(answers), 4),
+        "mean_guesses": (
+            round(float(np.mean(solved_guesses)), 4) if solved_guesses else None
+        ),
+        "guess_distribution": distribution,
+        "latency_ms": latency_summary(move_seconds),
+        "latency_ms_by_move": {
+            str(move): latency_summary(seconds)
+            for move, seconds in sorted(move_seconds_by_move.items())
+        },
+        "setup_seconds": round(setup_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "pattern_matrix_mb": round(strategy.patterns.nbytes / 2**20, 1),
+        "guess_pool": _guess_pool_summary(trace),
+        "caches": {
+            "result_cache": result_cache.stats(),
+            "expected_table": expected_table.stats(),
+            "candidate_table": candidate_table.stats(),
+        },
+    }
+
+
+def _metric(result: dict[str, Any], path: tuple[str, ...]) -> Optional[float]:
+    value: Any = result
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """
+    Print each compared metric against the baseline and return the ones
+    that got worse by more than tolerance (a fraction).
+    """
+    for key in ("filename", "max_words", "answers_hash", "cold", "n"):
+        if results.get(key) != baseline.get(key):
+            print(f"warning: {key} differs from the baseline", file=sys.stderr)
+
+    regressions: list[str] = []
+    for spec, result in results["results"].items():
+        base = baseline["results"].get(spec)
+        if base is None:
+            print(f"{spec}: not in baseline")
+            continue
+
+        print(f"{spec}:")
+        for path, higher_is_better in COMPARED_METRICS.items():
+            current, previous = _metric(result, path), _metric(base, path)
+            if current is None or previous is None:
+                continue
+
+            name = ".".join(path)
+            change = (current - previous) / previous if previous else 0.0
+            print(f"  {name}: {previous} -> {current} ({change:+.1%})")
+
+            worse = -change if higher_is_better else change
+            if worse > tolerance:
+                regressions.append(f"{spec} {name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("strategies", nargs="+", help='e.g. "minimax:depth=1"')
+    parser.add_argument("--filename", default="normalized_scrabble_wordlist.csv")
+    parser.add_argument("--max-words", type=int, default=None)
+    parser.add_argument(
+        "--games", type=int, default=None, help="Answers to sample. Default all."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-n", type=int, default=3, help="Suggestions per move")
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="Skip the opening book and clear caches before every game",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Check each strategy against reference implementations first",
+    )
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare with saved results")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Fractional change counted as a regression",
+    )
+    args = parser.parse_args()
+
+    wordlist = load_wordlist(Path(args.filename), max_words=args.max_words)
+    answers = [word for word, _ in wordlist]
+    if args.games is not None and args.games < len(answers):
+        rng = np.random.default_rng(args.seed)
+        picked = rng.choice(len(answers), size=args.games, replace=False)
+        answers = [answers[i] for i in sorted(picked)]
+
+    results: dict[str, Any] = {
+        "version": BENCHMARK_FORMAT_VERSION,
+        "filename": args.filename,
+        "max_words": args.max_words,
+        "answers_hash": wordlist_hash(answers),
+        "cold": args.cold,
+        "n": args.n,
+        "results": {},
+    }
+
+    for spec in args.strategies:
+        if args.check:
+            # In a process of its own, so the benchmark's caches start empty
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                failures = pool.submit(
+                    run_checks, spec, args.filename, args.max_words, args.n, args.seed
+                ).result()
+            for failure in failures:
+                print(f"{spec}: check failed: {failure}")
+            if failures:
+                sys.exit(1)
+            print(f"{spec}: checks passed")
+
+        # A fresh process per spec keeps caches and peak memory separate
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(
+                run_benchmark,
+                spec,
+                args.filename,
+                args.max_words,
+                answers,
+                args.n,
+                args.cold,
+            ).result()
+        results["results"][spec] = result
+
+        latency = result["latency_ms"]
+        print(
+            f"{spec}: solved {result['solve_rate']:.1%} "
+            f"in {result['mean_guesses']} guesses on average, "
+            f"p50 {latency['p50']}ms p90 {latency['p90']}ms p99 {latency['p99']}ms, "
+            f"peak {result['peak_rss_mb']}MB"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Wrote {args.output}.")
+
+    if args.baseline:
+        regressions = compare(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Precompute opening-book suggestions for a strategy configuration.
+
+Run from the repository root:
+    python -m scripts.build_opening_book entropy
+    python -m scripts.build_opening_book minimax --depth 0 --prune-k 50
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.models import Guess
+from src.strategy import EntropyStrategy, MinimaxStrategy
+from src.strategy.base import SAMPLE_MASS, SAMPLE_SIZE
+from src.strategy.book import OPENING_BOOK_PATH, OpeningBook
+from src.strategy.patterns import get_feedback_pattern
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("strategy", choices=["entropy", "minimax"])
+    parser.add_argument("--filename", default="normalized_scrabble_wordlist.csv")
+    parser.add_argument("--max-words", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=0)
+    parser.add_argument("--prune-k", type=int, default=50)
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE)
+    parser.add_argument("--sample-mass", type=float, default=SAMPLE_MASS)
+    parser.add_argument(
+        "--plies", type=int, choices=[1, 2], default=2, help="Guesses to precompute"
+    )
+    parser.add_argument("-n", type=int, default=5, help="Suggestions per position")
+    parser.add_argument("--output", type=Path, default=OPENING_BOOK_PATH)
+    args = parser.parse_args()
+
+    if args.strategy == "entropy":
+        strategy = EntropyStrategy(
+            filename=args.filename,
+            max_words=args.max_words,
+            sample_size=args.sample_size,
+            sample_mass=args.sample_mass,
+        )
+    else:
+        strategy = MinimaxStrategy(
+            filename=args.filename,
+            max_words=args.max_words,
+            depth=args.depth,
+            prune_k=args.prune_k,
+            sample_size=args.sample_size,
+            sample_mass=args.sample_mass,
+        )
+
+    book = OpeningBook(args.output)
+    start = time.perf_counter()
+
+    opening = strategy.suggest([], n=args.n)
+    book.add(strategy, [], opening)
+    print(f"Opening: {', '.join(opening)}")
+
+    if args.plies == 2:
+        # Every feedback the top opening guess can actually receive
+        first = opening[0]
+        results = sorted({get_feedback_pattern(first, word) for word in strategy.words})
+        for result in results:
+            if result == "11111":
+                continue
+            guesses = [Guess(first, result)]
+            book.add(strategy, guesses, strategy.suggest(guesses, n=args.n))
+        print(f"Booked replies to {len(results)} feedback patterns for {first}.")
+
+    book.save()
+    print(f"Wrote {args.output} in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Build the persisted feedback-pattern matrix for a wordlist.
+
+Run from the repository root:
+    python -m scripts.build_pattern_matrix normalized_scrabble_wordlist.csv
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.strategy.patterns import (
+    PATTERN_CACHE_DIR,
+    build_pattern_matrix,
+    pattern_matrix_path,
+    save_pattern_matrix,
+)
+from src.wordlist import load_wordlist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("filename", help="Wordlist CSV in wordlists/")
+    parser.add_argument("--max-words", type=int, default=None)
+    parser.add_argument("--output-dir", type=Path, default=PATTERN_CACHE_DIR)
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild even if the file exists"
+    )
+    args = parser.parse_args()
+
+    words = [
+        word for word, _ in load_wordlist(Path(args.filename), max_words=args.max_words)
+    ]
+    path = pattern_matrix_path(words, args.output_dir)
+
+    if path.exists() and not args.force:
+        print(f"{path} is up to date.")
+        return
+
+    print(f"Building {len(words)}x{len(words)} pattern matrix...")
+    start = time.perf_counter()
+    matrix = build_pattern_matrix(words, words)
+    save_pattern_matrix(matrix, path)
+    print(f"Wrote {path} in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
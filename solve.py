@@ -0,0 +1,210 @@
+"""
+Solve many target words offline with a strategy, without Telegram.
+
+Run from the repository root:
+    python solve.py minimax:depth=1,prune_k=20 --output games.jsonl
+    python solve.py entropy --targets targets.txt --output games.csv --workers 8
+    python solve.py entropy --output games.jsonl --resume
+
+Results stream to the output file one game per line, as JSONL or CSV
+depending on its extension. With --resume, targets already in the output
+are skipped and new games are appended.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.simulation import MAX_GUESSES, latency_summary, make_strategy, play_game
+from src.strategy.base import Strategy
+from src.strategy.book import history_key
+from src.wordlist import load_wordlist
+
+CSV_FIELDS = ["answer", "solved", "guess_count", "guesses", "move_ms"]
+
+# The strategy each worker process plays with, built by _init_worker
+_strategy: Optional[Strategy] = None
+
+
+def _init_worker(spec: str, filename: str, max_words: Optional[int]) -> None:
+    global _strategy
+    _strategy = make_strategy(spec, filename=filename, max_words=max_words)
+
+
+def _solve(answer: str, n: int) -> dict[str, Any]:
+    assert _strategy is not None
+    game = play_game(_strategy, answer, n=n)
+    return {
+        "answer": answer,
+        "solved": game.solved,
+        "guess_count": len(game.guesses),
+        "guesses": history_key(game.guesses),
+        "move_ms": [round(seconds * 1000, 3) for seconds in game.move_seconds],
+    }
+
+
+def _read_rows(path: Path, fmt: str) -> list[dict[str, Any]]:
+    """
+    Read the games already in an output file, dropping a trailing line
+    left incomplete by an interrupted run.
+    """
+    if not path.exists():
+        return []
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            f.truncate(complete)
+    lines = data[:complete].decode().splitlines()
+
+    if fmt == "jsonl":
+        return [json.loads(line) for line in lines if line]
+
+    rows = []
+    for row in csv.DictReader(lines):
+        rows.append(
+            {
+                "answer": row["answer"],
+                "solved": row["solved"] == "True",
+                "guess_count": int(row["guess_count"]),
+                "guesses": row["guesses"],
+                "move_ms": [float(ms) for ms in row["move_ms"].split()],
+            }
+        )
+    return rows
+
+
+def _write_row(f, fmt: str, row: dict[str, Any]) -> None:
+    if fmt == "jsonl":
+        f.write(json.dumps(row) + "\n")
+    else:
+        csv.writer(f).writerow(
+            [
+                row["answer"],
+                row["solved"],
+                row["guess_count"],
+                row["guesses"],
+                " ".join(str(ms) for ms in row["move_ms"]),
+            ]
+        )
+    f.flush()
+
+
+def _print_summary(rows: list[dict[str, Any]], elapsed: float) -> None:
+    solved = [row["guess_count"] for row in rows if row["solved"]]
+    distribution = {count: solved.count(count) for count in range(1, MAX_GUESSES + 1)}
+    move_seconds = [ms / 1000 for row in rows for ms in row["move_ms"]]
+    latency = latency_summary(move_seconds)
+
+    print(f"Games: {len(rows)} ({elapsed:.1f}s this run)")
+    if not rows:
+        return
+    print(f"Solved: {len(solved)}/{len(rows)} ({len(solved) / len(rows):.2%})")
+    if solved:
+        print(f"Mean guesses: {np.mean(solved):.4f}")
+    print(
+        "Distribution: "
+        + ", ".join(f"{count}: {games}" for count, games in distribution.items())
+        + f", X: {len(rows) - len(solved)}"
+    )
+    print(
+        f"Move latency: mean {latency['mean']}ms, p50 {latency['p50']}ms, "
+        f"p90 {latency['p90']}ms, p99 {latency['p99']}ms, max {latency['max']}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("strategy", help='e.g. "entropy" or "minimax:depth=1"')
+    parser.add_argument("--filename", default="normalized_scrabble_wordlist.csv")
+    parser.add_argument("--max-words", type=int, default=None)
+    parser.add_argument(
+        "--targets", type=Path, help="File with one target word per line"
+    )
+    parser.add_argument(
+        "--games", type=int, default=None, help="Targets to sample. Default all."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-n", type=int, default=3, help="Suggestions per move")
+    parser.add_argument("--output", type=Path, required=True, help=".jsonl or .csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--resume", action="store_true", help="Skip targets already in the output"
+    )
+    args = parser.parse_args()
+
+    fmt = "csv" if args.output.suffix == ".csv" else "jsonl"
+
+    wordlist = load_wordlist(Path(args.filename), max_words=args.max_words)
+    if args.targets:
+        targets = [
+            line.strip().upper()
+            for line in args.targets.read_text().splitlines()
+            if line.strip()
+        ]
+        # The strategy can only ever guess words from its wordlist
+        known = {word for word, _ in wordlist}
+        unknown = [target for target in targets if target not in known]
+        if unknown:
+            print(
+                f"Skipping {len(unknown)} targets not in the wordlist: "
+                + ", ".join(unknown[:10])
+                + (", ..." if len(unknown) > 10 else "")
+            )
+            targets = [target for target in targets if target in known]
+    else:
+        targets = [word for word, _ in wordlist]
+    if args.games is not None and args.games < len(targets):
+        rng = np.random.default_rng(args.seed)
+        picked = rng.choice(len(targets), size=args.games, replace=False)
+        targets = [targets[i] for i in sorted(picked)]
+
+    rows = _read_rows(args.output, fmt) if args.resume else []
+    done = {row["answer"] for row in rows}
+    remaining = [target for target in targets if target not in done]
+    if done:
+        print(f"Resuming: {len(done)} games done, {len(remaining)} to go.")
+
+    new_file = not (args.resume and args.output.exists())
+    start = time.perf_counter()
+    with (
+        open(args.output, "w" if new_file else "a", newline="") as f,
+        ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.strategy, args.filename, args.max_words),
+        ) as pool,
+    ):
+        if new_file and fmt == "csv":
+            csv.writer(f).writerow(CSV_FIELDS)
+
+        n_args = [args.n] * len(remaining)
+        chunksize = max(1, len(remaining) // (args.workers * 16))
+        try:
+            for count, row in enumerate(
+                pool.map(_solve, remaining, n_args, chunksize=chunksize), start=1
+            ):
+                _write_row(f, fmt, row)
+                rows.append(row)
+                if count % 100 == 0:
+                    print(f"{count}/{len(remaining)} games", flush=True)
+        except KeyboardInterrupt:
+            pool.shutdown(cancel_futures=True)
+            print("Interrupted. Rerun with --resume to continue.")
+
+    _print_summary(rows, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
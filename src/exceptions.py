@@ -4,3 +4,11 @@ class BotException(Exception):
     """
 
     ...
+
+
+class RequestSuperseded(Exception):
+    """
+    A request dropped because a newer one for the same session arrived
+    """
+
+    ...
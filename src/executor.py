@@ -0,0 +1,366 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+from src.exceptions import BotException
+from src.metrics import (
+    clear_worker_snapshots,
+    executor_pending,
+    process_snapshot,
+    record_worker_snapshot,
+    search_depth,
+    strategy_downgrades,
+    strategy_duration,
+    strategy_rejections,
+)
+from src.models import Guess
+from src.scheduler import CHEAP, EXPENSIVE, CostScheduler
+from src.strategy.base import Strategy
+from src.trace import count, current_trace, span, tracing
+
+STRATEGY_EXECUTOR = os.getenv("STRATEGY_EXECUTOR") or "process"
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS") or os.cpu_count() or 1)
+STRATEGY_QUEUE_SIZE = int(os.getenv("STRATEGY_QUEUE_SIZE") or 32)
+STRATEGY_TIMEOUT = float(os.getenv("STRATEGY_TIMEOUT") or 30)
+# Searches estimated to look up more feedback patterns than this are expensive
+STRATEGY_EXPENSIVE_COST = float(os.getenv("STRATEGY_EXPENSIVE_COST") or 5e7)
+STRATEGY_EXPENSIVE_WORKERS = (
+    int(os.environ["STRATEGY_EXPENSIVE_WORKERS"])
+    if os.getenv("STRATEGY_EXPENSIVE_WORKERS")
+    else None
+)
+STRATEGY_EXPENSIVE_QUEUE_SIZE = int(os.getenv("STRATEGY_EXPENSIVE_QUEUE_SIZE") or 4)
+
+# Strategies built inside a worker process, keyed by class and config
+_worker_strategies: dict[tuple[type[Strategy], str], Strategy] = {}
+
+
+def _get_worker_strategy(
+    strategy_type: type[Strategy], config: dict[str, Any]
+) -> Strategy:
+    key = (strategy_type, json.dumps(config, sort_keys=True))
+    if key not in _worker_strategies:
+        _worker_strategies[key] = strategy_type(**config)
+    return _worker_strategies[key]
+
+
+def _warm_worker(specs: list[tuple[type[Strategy], dict[str, Any]]]) -> None:
+    """Load wordlists and pattern matrices before the first request arrives."""
+    for strategy_type, config in specs:
+        _get_worker_strategy(strategy_type, config)
+
+
+def _ping() -> None:
+    """No-op task used to spawn workers ahead of the first request."""
+
+
+def _execute_in_worker(
+    strategy_type: type[Strategy],
+    config: dict[str, Any],
+    guesses: list[Guess],
+    n: int,
+    candidates: Optional[np.ndarray],
+) -> tuple[list[str], dict[str, Any], dict[str, Any]]:
+    strategy = _get_worker_strategy(strategy_type, config)
+    # Traces don't cross processes; the caller merges this one into its own.
+    # Always traced, so the executor sees e.g. the depth reached.
+    with tracing(True) as trace:
+        suggestions = strategy.execute(guesses, n=n, candidates=candidates)
+    assert trace is not None
+    # The worker's caches and memory, which metrics in the caller can't see
+    return suggestions, trace.to_dict(), process_snapshot()
+
+
+class _Search:
+    """A search in flight and the number of requests awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[list[str]]"):
+        self.task = task
+        self.waiters = 0
+
+
+class StrategyExecutor:
+    """
+    Runs strategy searches off the event loop, on a process pool by default.
+
+    Searches are classed as cheap or expensive from their estimated cost
+    and take turns for the workers, cheap ones first. Expensive ones run
+    on at most expensive_workers at once (half the workers by default).
+    Each class queues up to its queue size; beyond that, expensive
+    searches fall back to a cheaper strategy if there is one, and
+    requests are otherwise rejected instead of piling up. Each request
+    is bounded by a timeout. Identical concurrent requests share one
+    search and count once.
+    """
+
+    def __init__(
+        self,
+        kind: str = STRATEGY_EXECUTOR,
+        workers: int = STRATEGY_WORKERS,
+        queue_size: int = STRATEGY_QUEUE_SIZE,
+        timeout: float = STRATEGY_TIMEOUT,
+        expensive_cost: float = STRATEGY_EXPENSIVE_COST,
+        expensive_workers: Optional[int] = STRATEGY_EXPENSIVE_WORKERS,
+        expensive_queue_size: int = STRATEGY_EXPENSIVE_QUEUE_SIZE,
+    ):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.expensive_cost = expensive_cost
+        self.expensive_workers = expensive_workers
+        self.expensive_queue_size = expensive_queue_size
+        self.pending = 0
+        self._pool: Optional[Executor] = None
+        self._scheduler: Optional[CostScheduler] = None
+        # Searches in flight by result key, joined by identical requests
+        self._searches: dict[Hashable, _Search] = {}
+
+    def start(self, strategies: list[Strategy]) -> None:
+        """Start the pool, pre-warming workers with the given strategies."""
+        self._scheduler = CostScheduler(
+            self.workers,
+            (
+                self.expensive_workers
+                if self.expensive_workers is not None
+                else self.workers // 2
+            ),
+            {CHEAP: self.queue_size, EXPENSIVE: self.expensive_queue_size},
+        )
+        if self.kind == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            return
+
+        specs = [(type(strategy), strategy.config) for strategy in strategies]
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_warm_worker,
+            initargs=(specs,),
+        )
+        # Workers spawn on demand; submit one task each so they start now
+        for _ in range(self.workers):
+            self._pool.submit(_ping)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._scheduler = None
+        clear_worker_snapshots()
+
+    def cost_class(self, strategy: Strategy, candidates: Optional[np.ndarray]) -> str:
+        """Class a search as cheap or expensive by its estimated cost."""
+        remaining = len(candidates) if candidates is not None else len(strategy.words)
+        if strategy.estimate_cost(remaining) > self.expensive_cost:
+            return EXPENSIVE
+        return CHEAP
+
+    async def execute(
+        self,
+        strategy: Strategy,
+        guesses: list[Guess],
+        n: int = 1,
+        candidates: Optional[np.ndarray] = None,
+    ) -> list[str]:
+        """
+        Return the top n suggestions without blocking the event loop.
+
+        Concurrent requests with the same result key share one search, which
+        is cancelled if every request awaiting it is.
+        """
+        start = time.perf_counter()
+
+        # Book and cache hits are cheap enough to answer in-process
+        suggestions = strategy.lookup(guesses, n, candidates)
+        if suggestions is not None:
+            strategy_duration.observe(
+                time.perf_counter() - start, strategy=strategy.name, source="lookup"
+            )
+            return suggestions
+
+        key = strategy.result_key(guesses, n, candidates)
+        search = self._searches.get(key)
+        if search is None:
+            scheduler = self._scheduler
+            if scheduler is None:
+                raise RuntimeError("StrategyExecutor has not been started")
+            cost_class = self.cost_class(strategy, candidates)
+            if not scheduler.admit(cost_class):
+                downgraded = strategy.downgrade()
+                if downgraded is None:
+                    strategy_rejections.inc(reason="busy")
+                    raise BotException(
+                        "The bot is busy right now. Please try again shortly."
+                    )
+                strategy_downgrades.inc(strategy=strategy.name)
+                count("downgraded")
+                return await self.execute(downgraded, guesses, n, candidates)
+
+            search = _Search(
+                asyncio.create_task(
+                    self._search(strategy, cost_class, guesses, n, candidates)
+                )
+            )
+            self._searches[key] = search
+            self.pending += 1
+            search.task.add_done_callback(
+                lambda _: self._finish_search(key, cost_class, scheduler)
+            )
+            source = "search"
+        else:
+            count("coalesced")
+            source = "coalesced"
+
+        search.waiters += 1
+        try:
+            # Shielded so one request's cancellation doesn't end a shared search
+            suggestions = await asyncio.shield(search.task)
+        finally:
+            search.waiters -= 1
+            if search.waiters == 0 and not search.task.done():
+                search.task.cancel()
+
+        strategy_duration.observe(
+            time.perf_counter() - start, strategy=strategy.name, source=source
+        )
+        return list(suggestions)
+
+    async def _search(
+        self,
+        strategy: Strategy,
+        cost_class: str,
+        guesses: list[Guess],
+        n: int,
+        candidates: Optional[np.ndarray],
+    ) -> list[str]:
+        assert self._pool is not None and self._scheduler is not None
+        trace = current_trace()
+        future: Optional[Future] = None
+        try:
+            async with asyncio.timeout(self.timeout):
+                with span("queued"):
+                    await self._scheduler.acquire(cost_class)
+                future = self._submit(strategy, cost_class, guesses, n, candidates)
+                with span("executor"):
+                    result = await asyncio.wrap_future(future)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future is not None and not future.cancel():
+                # A search already running can't be stopped; keep what it finds
+                future.add_done_callback(
+                    lambda done: self._remember_finished(
+                        strategy, guesses, n, candidates, done
+                    )
+                )
+            if isinstance(e, asyncio.TimeoutError):
+                strategy_rejections.inc(reason="timeout")
+                raise BotException(
+                    "Finding a suggestion took too long. Please try again."
+                )
+            raise
+
+        suggestions, search_trace = self._unpack(result)
+        if trace is not None:
+            trace.merge(search_trace)
+        counters = search_trace["counters"]
+        if "completed_depth" in counters:
+            # Shallower than requested when the time budget ran out
+            search_depth.inc(
+                strategy=strategy.name,
+                requested=str(int(counters["requested_depth"])),
+                completed=str(int(counters["completed_depth"])),
+            )
+        if strategy.complete(counters):
+            strategy.remember(guesses, n, candidates, suggestions)
+        return suggestions
+
+    def _submit(
+        self,
+        strategy: Strategy,
+        cost_class: str,
+        guesses: list[Guess],
+        n: int,
+        candidates: Optional[np.ndarray],
+    ) -> Future:
+        """Submit a search holding a scheduler slot, released once it's done."""
+        assert self._pool is not None and self._scheduler is not None
+        scheduler = self._scheduler
+        try:
+            if self.kind == "thread":
+                # Pool threads don't share the caller's trace; returned instead
+                future = self._pool.submit(
+                    strategy.traced_suggest, guesses, n, candidates
+                )
+            else:
+                future = self._pool.submit(
+                    _execute_in_worker,
+                    type(strategy),
+                    strategy.config,
+                    list(guesses),
+                    n,
+                    candidates,
+                )
+        except BaseException:
+            scheduler.release(cost_class)
+            raise
+
+        # The slot is held until the worker is free, even if nobody waits
+        # for the result any more
+        loop = asyncio.get_running_loop()
+
+        def release(_: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(scheduler.release, cost_class)
+            except RuntimeError:
+                # The loop closed while the search ran; nothing to release to
+                pass
+
+        future.add_done_callback(release)
+        return future
+
+    def _unpack(self, result: tuple) -> tuple[list[str], dict[str, Any]]:
+        """Split a search's result, recording the snapshot of a worker process."""
+        if self.kind == "process":
+            suggestions, search_trace, snapshot = result
+            record_worker_snapshot(snapshot)
+            return suggestions, search_trace
+        return result
+
+    def _finish_search(
+        self, key: Hashable, cost_class: str, scheduler: CostScheduler
+    ) -> None:
+        del self._searches[key]
+        self.pending -= 1
+        scheduler.leave(cost_class)
+
+    def _remember_finished(
+        self,
+        strategy: Strategy,
+        guesses: list[Guess],
+        n: int,
+        candidates: Optional[np.ndarray],
+        future: Future,
+    ) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        suggestions, search_trace = self._unpack(future.result())
+        if strategy.complete(search_trace["counters"]):
+            strategy.remember(guesses, n, candidates, suggestions)
+
+
+executor = StrategyExecutor()
+executor_pending.set_function(lambda: executor.pending)
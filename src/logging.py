@@ -1,37 +1,195 @@
+import atexit
 import json
 import logging
+import multiprocessing
 import os
+import queue
+import re
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
+from threading import Thread
 import time
 import uuid
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from src.metrics import handler_duration, log_records_dropped
+from src.trace import Trace, tracing
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE") or 10_000)
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE") or 256)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES") or 0)
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT") or 5)
+
+# DEBUG records are dropped once the queue is this full, keeping room for
+# the records that matter
+_DEBUG_HIGH_WATER = 0.5
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(record.created))
+        log_entry = {"timestamp": timestamp, "level": record.levelname, **record.msg}
+        return json.dumps(log_entry, default=str)
+
+
+class _DroppingQueueHandler(logging.Handler):
+    """Hands records to the background writer, dropping them rather than block."""
+
+    def __init__(self, records: queue.Queue):
+        super().__init__()
+        self.records = records
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if (
+            record.levelno <= logging.DEBUG
+            and self.records.qsize() >= self.records.maxsize * _DEBUG_HIGH_WATER
+        ):
+            self._drop(record)
+            return
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            self._drop(record)
+
+    def _drop(self, record: logging.LogRecord) -> None:
+        self.dropped += 1
+        log_records_dropped.inc(level=record.levelname)
+
+
+class _BatchWriter(Thread):
+    """
+    Writes queued records to a file handler in batches, with one write and
+    one flush per batch, rotating the file first if the batch would grow it
+    past the handler's maxBytes.
+    """
+
+    def __init__(
+        self,
+        records: queue.Queue,
+        handler: logging.FileHandler,
+        source: _DroppingQueueHandler,
+        batch_size: int,
+    ):
+        super().__init__(name="log-writer", daemon=True)
+        self.records = records
+        self.handler = handler
+        self.source = source
+        self.batch_size = batch_size
+        self._reported_drops = 0
+
+    def run(self) -> None:
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None is the shutdown sentinel, queued after every real record
+            stopping = batch[-1] is None
+            self._write([record for record in batch if record is not None])
+            if stopping:
+                return
+
+    def _write(self, records: list[logging.LogRecord]) -> None:
+        lines = [self.handler.format(record) for record in records]
+
+        dropped = self.source.dropped - self._reported_drops
+        if dropped:
+            self._reported_drops += dropped
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+            lines.append(
+                json.dumps(
+                    {
+                        "timestamp": timestamp,
+                        "level": "WARNING",
+                        "message": "log_records_dropped",
+                        "count": dropped,
+                    }
+                )
+            )
+        if not lines:
+            return
+
+        data = "\n".join(lines) + "\n"
+        handler = self.handler
+        try:
+            with handler.lock:
+                if (
+                    isinstance(handler, RotatingFileHandler)
+                    and handler.maxBytes > 0
+                    and handler.stream.tell() + len(data) >= handler.maxBytes
+                ):
+                    handler.doRollover()
+                handler.stream.write(data)
+                handler.stream.flush()
+        except Exception:
+            handler.handleError(records[0] if records else None)
+
+
+def _rotating_log_name() -> str:
+    """
+    Return the file a rotating log is written to by this process. Rotation
+    renames the file, which processes sharing it can't coordinate, so each
+    process other than the main one, e.g. webhook bot workers, gets its own.
+    """
+    if multiprocessing.parent_process() is None:
+        return "bot.log"
+    name = re.sub(r"[^A-Za-z0-9_-]", "-", multiprocessing.current_process().name)
+    return f"bot.{name}.log"
+
 
 class StructuredLogger:
-    """JSON structured logger for consistent, parseable log output."""
+    """
+    JSON structured logger for consistent, parseable log output.
+
+    Logging never blocks the caller: records go onto a bounded queue and a
+    background thread formats and writes them in batches. When the queue
+    fills, DEBUG records are dropped first, then any record.
+    """
 
     def __init__(self, name: str, log_dir: Path):
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
+        self._writer: Optional[_BatchWriter] = None
 
         if not self.logger.handlers:
-            handler = logging.FileHandler(log_dir / "bot.log")
-            handler.setFormatter(logging.Formatter("%(message)s"))
-            self.logger.addHandler(handler)
+            if LOG_MAX_BYTES > 0:
+                handler: logging.FileHandler = RotatingFileHandler(
+                    log_dir / _rotating_log_name(),
+                    maxBytes=LOG_MAX_BYTES,
+                    backupCount=LOG_BACKUP_COUNT,
+                )
+            else:
+                handler = logging.FileHandler(log_dir / "bot.log")
+            handler.setFormatter(_JsonFormatter())
+
+            records: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            queue_handler = _DroppingQueueHandler(records)
+            self.logger.addHandler(queue_handler)
+
+            self._writer = _BatchWriter(records, handler, queue_handler, LOG_BATCH_SIZE)
+            self._writer.start()
+            atexit.register(self.close)
+
+    def close(self) -> None:
+        """Write out every queued record and stop the background writer."""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        self._writer.records.put(None)
+        self._writer.join()
+        self._writer.handler.close()
 
     def _log(self, level: str, message: str, **kwargs: Any) -> None:
-        log_entry = {
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
-            "level": level,
-            "message": message,
-            **kwargs,
-        }
-        log_method = getattr(self.logger, level.lower())
-        log_method(json.dumps(log_entry))
+        # Serialized by the background writer, off the caller's thread
+        log_entry = {"message": message, **kwargs}
+        self.logger.log(logging.getLevelName(level), log_entry)
 
     def info(self, message: str, **kwargs: Any) -> None:
         self._log("INFO", message, **kwargs)
@@ -49,6 +207,10 @@ class StructuredLogger:
 logger = StructuredLogger("wordle_bot", Path(os.getenv("LOG_DIR", "./logs")))
 
 
+def _trace_fields(trace: Optional[Trace]) -> dict[str, Any]:
+    return {"trace": trace.to_dict()} if trace is not None else {}
+
+
 def log_command(func: Callable) -> Callable:
     """Decorator to log command handler execution with context."""
 
@@ -68,35 +230,45 @@ def log_command(func: Callable) -> Callable:
             "chat_type": chat.type if chat else None,
         }
 
-        try:
-            result = await func(update, context)
-            execution_time_ms = (time.perf_counter() - start_time) * 1000
-
-            logger.info(
-                "command_executed",
-                request_id=request_id,
-                command=func.__name__,
-                user=user_info,
-                chat=chat_info,
-                execution_time_ms=round(execution_time_ms, 2),
-                status="success",
-            )
-            return result
-
-        except Exception as e:
-            execution_time_ms = (time.perf_counter() - start_time) * 1000
-
-            logger.error(
-                "command_executed",
-                request_id=request_id,
-                command=func.__name__,
-                user=user_info,
-                chat=chat_info,
-                execution_time_ms=round(execution_time_ms, 2),
-                status="error",
-                error_type=type(e).__name__,
-                error_message=str(e),
-            )
-            raise
+        # Phase timings and counters recorded while handling, if enabled
+        with tracing() as trace:
+            try:
+                result = await func(update, context)
+                execution_time_ms = (time.perf_counter() - start_time) * 1000
+                handler_duration.observe(
+                    execution_time_ms / 1000, command=func.__name__, status="success"
+                )
+
+                logger.info(
+                    "command_executed",
+                    request_id=request_id,
+                    command=func.__name__,
+                    user=user_info,
+                    chat=chat_info,
+                    execution_time_ms=round(execution_time_ms, 2),
+                    status="success",
+                    **_trace_fields(trace),
+                )
+                return result
+
+            except Exception as e:
+                execution_time_ms = (time.perf_counter() - start_time) * 1000
+                handler_duration.observe(
+                    execution_time_ms / 1000, command=func.__name__, status="error"
+                )
+
+                logger.error(
+                    "command_executed",
+                    request_id=request_id,
+                    command=func.__name__,
+                    user=user_info,
+                    chat=chat_info,
+                    execution_time_ms=round(execution_time_ms, 2),
+                    status="error",
+                    error_type=type(e).__name__,
+                    error_message=str(e),
+                    **_trace_fields(trace),
+                )
+                raise
 
     return wrapper
@@ -0,0 +1,362 @@
+import os
+import resource
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Callable, Optional, TypeVar, Union
+
+from src.strategy.cache import LRUCache, result_cache
+from src.strategy.minimax import candidate_table, expected_table
+
+METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.getenv("METRICS_PORT") else None
+METRICS_HOST = os.getenv("METRICS_HOST") or "127.0.0.1"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+LabelValues = tuple[str, ...]
+# A callback returns one value, or a value per tuple of label values
+MetricFunction = Callable[[], Union[float, dict[LabelValues, float]]]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric with optional labels, rendered in Prometheus text format."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[LabelValues, float] = {}
+        self._function: Optional[MetricFunction] = None
+        self._lock = Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: MetricFunction) -> None:
+        """Read values from a callback at scrape time instead of storing them."""
+        self._function = function
+
+    def samples(self) -> list[tuple[str, LabelValues, float]]:
+        if self._function is not None:
+            values = self._function()
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, key, value) for key, value in sorted(values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, key, value in self.samples():
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label values: a count per bucket (not cumulative), then the sum
+        self._observations: dict[LabelValues, tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._observations.get(key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._observations[key] = (counts, total + value)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            observations = {
+                key: (list(counts), total)
+                for key, (counts, total) in self._observations.items()
+            }
+
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, (counts, total) in sorted(observations.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(
+                    bucket_labelnames, key + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines)
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+handler_duration = registry.register(
+    Histogram(
+        "wordle_handler_duration_seconds",
+        "Time spent handling a bot command.",
+        ("command", "status"),
+    )
+)
+strategy_duration = registry.register(
+    Histogram(
+        "wordle_strategy_duration_seconds",
+        "Time to produce suggestions, by strategy and where they came from.",
+        ("strategy", "source"),
+    )
+)
+search_depth = registry.register(
+    Counter(
+        "wordle_search_depth_total",
+        "Searches by lookahead depth requested and deepest finished in time.",
+        ("strategy", "requested", "completed"),
+    )
+)
+strategy_rejections = registry.register(
+    Counter(
+        "wordle_strategy_rejections_total",
+        "Suggestion requests refused because the executor was busy or timed out.",
+        ("reason",),
+    )
+)
+requests_superseded = registry.register(
+    Counter(
+        "wordle_requests_superseded_total",
+        "Requests dropped because a newer one for the same session arrived.",
+    )
+)
+strategy_downgrades = registry.register(
+    Counter(
+        "wordle_strategy_downgrades_total",
+        "Expensive searches downgraded to a cheaper strategy under load.",
+        ("strategy",),
+    )
+)
+executor_pending = registry.register(
+    Gauge(
+        "wordle_executor_pending",
+        "Suggestion requests running or queued on the strategy executor.",
+    )
+)
+log_records_dropped = registry.register(
+    Counter(
+        "wordle_log_records_dropped_total",
+        "Log records dropped because the log queue was full.",
+        ("level",),
+    )
+)
+active_sessions = registry.register(
+    Gauge("wordle_active_sessions", "Game sessions held in memory.")
+)
+
+CACHES: dict[str, LRUCache] = {
+    "result_cache": result_cache,
+    "expected_table": expected_table,
+    "candidate_table": candidate_table,
+}
+# Caches filled wherever searches run, in strategy worker processes by default
+SEARCH_CACHES = ("expected_table", "candidate_table")
+
+# Latest snapshot reported by each strategy worker process, keyed by pid
+_worker_snapshots: dict[int, dict[str, Any]] = {}
+_worker_snapshots_lock = Lock()
+
+
+def process_snapshot() -> dict[str, Any]:
+    """Return this process's search cache stats and memory, for a worker to report."""
+    return {
+        "pid": os.getpid(),
+        "caches": {name: CACHES[name].stats() for name in SEARCH_CACHES},
+        "resident_memory_bytes": _resident_memory_bytes(),
+    }
+
+
+def record_worker_snapshot(snapshot: dict[str, Any]) -> None:
+    """Keep a worker's latest snapshot, replacing its previous one."""
+    with _worker_snapshots_lock:
+        _worker_snapshots[snapshot["pid"]] = snapshot
+
+
+def clear_worker_snapshots() -> None:
+    """Forget every worker, e.g. once their pool has shut down."""
+    with _worker_snapshots_lock:
+        _worker_snapshots.clear()
+
+
+def _cache_stats() -> dict[str, dict[str, int]]:
+    """Stats per cache, this process's plus every worker's for search caches."""
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    with _worker_snapshots_lock:
+        snapshots = list(_worker_snapshots.values())
+    for snapshot in snapshots:
+        for name, worker_stats in snapshot["caches"].items():
+            for stat, value in worker_stats.items():
+                stats[name][stat] += value
+    return stats
+
+
+def _cache_stat(stat: str) -> MetricFunction:
+    return lambda: {(name,): stats[stat] for name, stats in _cache_stats().items()}
+
+
+def _cache_hit_ratio() -> dict[LabelValues, float]:
+    ratios = {}
+    for name, stats in _cache_stats().items():
+        lookups = stats["hits"] + stats["misses"]
+        ratios[(name,)] = stats["hits"] / lookups if lookups else 0.0
+    return ratios
+
+
+for metric, stat in [
+    (Gauge("wordle_cache_entries", "Entries held in a cache.", ("cache",)), "size"),
+    (Counter("wordle_cache_hits_total", "Cache lookups that hit.", ("cache",)), "hits"),
+    (
+        Counter("wordle_cache_misses_total", "Cache lookups that missed.", ("cache",)),
+        "misses",
+    ),
+    (
+        Counter("wordle_cache_evictions_total", "Entries evicted.", ("cache",)),
+        "evictions",
+    ),
+]:
+    metric.set_function(_cache_stat(stat))
+    registry.register(metric)
+
+registry.register(
+    Gauge("wordle_cache_hit_ratio", "Hits over lookups per cache.", ("cache",))
+).set_function(_cache_hit_ratio)
+
+
+def _resident_memory_bytes() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return _peak_resident_memory_bytes()
+
+
+def _peak_resident_memory_bytes() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+registry.register(
+    Gauge("process_resident_memory_bytes", "Resident memory size in bytes.")
+).set_function(_resident_memory_bytes)
+registry.register(
+    Gauge("process_peak_resident_memory_bytes", "Peak resident memory in bytes.")
+).set_function(_peak_resident_memory_bytes)
+
+
+def _worker_resident_memory_bytes() -> float:
+    with _worker_snapshots_lock:
+        return sum(
+            snapshot["resident_memory_bytes"] for snapshot in _worker_snapshots.values()
+        )
+
+
+registry.register(
+    Gauge(
+        "wordle_strategy_workers_resident_memory_bytes",
+        "Resident memory of the strategy worker processes in bytes, as of each"
+        " one's last search. 0 when searches run in this process.",
+    )
+).set_function(_worker_resident_memory_bytes)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes are frequent; keep them out of stderr
+        pass
+
+
+def start_metrics_server(
+    port: Optional[int] = METRICS_PORT, host: str = METRICS_HOST
+) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread. Does nothing if port is None."""
+    if port is None:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
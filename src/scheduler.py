@@ -0,0 +1,77 @@
+import asyncio
+from collections import deque
+
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+# In priority order
+COST_CLASSES = (CHEAP, EXPENSIVE)
+
+
+class CostScheduler:
+    """
+    Hands out a fixed number of worker slots to searches, cheap ones first.
+
+    Expensive searches hold at most expensive_slots of them at once, so a
+    few long searches can't starve cheap ones. Searches wait for a slot in
+    a queue per cost class, and admit() refuses them once their class has
+    as many searches as it can run plus queue_sizes[cost_class].
+    """
+
+    def __init__(self, slots: int, expensive_slots: int, queue_sizes: dict[str, int]):
+        self.slots = slots
+        self.limits = {CHEAP: slots, EXPENSIVE: max(1, min(slots, expensive_slots))}
+        self.queue_sizes = queue_sizes
+        self.admitted = {cost_class: 0 for cost_class in COST_CLASSES}
+        self.running = {cost_class: 0 for cost_class in COST_CLASSES}
+        self._waiting: dict[str, deque[asyncio.Future[None]]] = {
+            cost_class: deque() for cost_class in COST_CLASSES
+        }
+
+    def admit(self, cost_class: str) -> bool:
+        """Count a search in, or return False if its class is full."""
+        capacity = self.limits[cost_class] + self.queue_sizes[cost_class]
+        if self.admitted[cost_class] >= capacity:
+            return False
+        self.admitted[cost_class] += 1
+        return True
+
+    def leave(self, cost_class: str) -> None:
+        """Count out an admitted search once it is done or abandoned."""
+        self.admitted[cost_class] -= 1
+
+    def _can_run(self, cost_class: str) -> bool:
+        return (
+            sum(self.running.values()) < self.slots
+            and self.running[cost_class] < self.limits[cost_class]
+        )
+
+    async def acquire(self, cost_class: str) -> None:
+        """Wait for a slot. Call release() once the search is done with it."""
+        waiting = self._waiting[cost_class]
+        if not waiting and self._can_run(cost_class):
+            self.running[cost_class] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiting.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Unless release() already dropped it
+                if future in waiting:
+                    waiting.remove(future)
+            else:
+                # Granted a slot as it was cancelled; pass it on
+                self.release(cost_class)
+            raise
+
+    def release(self, cost_class: str) -> None:
+        self.running[cost_class] -= 1
+        for next_class in COST_CLASSES:
+            waiting = self._waiting[next_class]
+            while waiting and self._can_run(next_class):
+                future = waiting.popleft()
+                if not future.cancelled():
+                    self.running[next_class] += 1
+                    future.set_result(None)
@@ -1,58 +1,329 @@
-from dataclasses import dataclass, field
-from typing import Optional
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Optional, TypeVar
 
+import numpy as np
+
+from src.exceptions import RequestSuperseded
+from src.metrics import active_sessions, requests_superseded
 from src.models import Guess
-from src.strategy import EntropyStrategy
+from src.session_backend import SessionBackend, StoredSession, create_backend
+from src.strategy import EntropyStrategy, MinimaxStrategy
 from src.strategy.base import Strategy
+from src.strategy.patterns import SOLVED_PATTERN, decode_pattern, encode_pattern
+
+SESSION_TTL = float(os.getenv("SESSION_TTL") or 24 * 60 * 60)
+SESSION_MAX = int(os.getenv("SESSION_MAX") or 100_000)
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL") or 60)
+
+# Each guess is packed as its 5 letters then its feedback pattern code
+_GUESS_SIZE = 6
+
+T = TypeVar("T")
+
+# Strategy instances shared by every session, by the name sessions store
+strategies: dict[str, Strategy] = {
+    "entropy": EntropyStrategy(),
+    "minimax": MinimaxStrategy(),
+}
+default_strategy = strategies["entropy"]
 
 
-@dataclass
 class GameSession:
-    """Stores the state of a Wordle game."""
+    """
+    Stores the state of a Wordle game.
+
+    Sessions are kept compact so many dormant ones fit in memory: guesses
+    are packed into bytes, the strategy is a shared instance, and the
+    remaining candidates are dropped while idle and re-derived on use.
+    """
+
+    __slots__ = ("strategy", "last_active", "_guesses", "_candidates")
+
+    def __init__(self, strategy: Strategy = default_strategy):
+        self.strategy = strategy
+        self.last_active = time.monotonic()
+        self._guesses = b""
+        # Wordlist indices still consistent with the guesses. None for all
+        # words, or when dropped by compact() and not yet re-derived.
+        self._candidates: Optional[np.ndarray] = None
+
+    @classmethod
+    def restore(cls, stored: StoredSession) -> "GameSession":
+        session = cls(strategies.get(stored.strategy, default_strategy))
+        session._guesses = stored.guesses
+        return session
+
+    def store(self) -> StoredSession:
+        """Return the state needed to restore this session."""
+        name = next(
+            (
+                name
+                for name, strategy in strategies.items()
+                if strategy is self.strategy
+            ),
+            "entropy",
+        )
+        return StoredSession(name, self._guesses)
+
+    @property
+    def guesses(self) -> list[Guess]:
+        return [
+            Guess(
+                self._guesses[i : i + 5].decode("ascii"),
+                decode_pattern(self._guesses[i + 5]),
+            )
+            for i in range(0, len(self._guesses), _GUESS_SIZE)
+        ]
 
-    guesses: list[Guess] = field(default_factory=list)
-    strategy: Strategy = EntropyStrategy()
+    @property
+    def candidates(self) -> Optional[np.ndarray]:
+        if self._candidates is None and self._guesses:
+            for guess in self.guesses:
+                self._candidates = self.strategy.narrow_candidates(
+                    self._candidates, guess
+                )
+        return self._candidates
 
     def add_guess(self, word: str, result: str) -> None:
-        self.guesses.append(Guess(word.upper(), result))
+        guess = Guess(word.upper(), result)
+        self._candidates = self.strategy.narrow_candidates(self.candidates, guess)
+        self._guesses += guess.word.encode("ascii") + bytes(
+            [encode_pattern(guess.result)]
+        )
+
+    def set_strategy(self, strategy: Strategy) -> None:
+        """Switch strategy, re-deriving candidates against its wordlist."""
+        self.strategy = strategy
+        self._candidates = None
+
+    def compact(self) -> None:
+        """Drop state that can be re-derived from the guesses."""
+        self._candidates = None
 
     def reset(self) -> int:
         """Reset the session and return the number of guesses that were made."""
-        count = len(self.guesses)
-        self.guesses = []
+        count = len(self._guesses) // _GUESS_SIZE
+        self._guesses = b""
+        self._candidates = None
         return count
 
     def is_won(self) -> bool:
         """Check if the last guess was correct (all greens)."""
-        if not self.guesses:
+        if not self._guesses:
             return False
-        return self.guesses[-1].result == "11111"
+        return self._guesses[-1] == SOLVED_PATTERN
 
     def is_complete(self) -> bool:
         """Check if the game is over (won or 6 guesses)."""
-        return self.is_won() or len(self.guesses) >= 6
+        return self.is_won() or len(self._guesses) // _GUESS_SIZE >= 6
 
 
-class SessionManager:
-    """Manages game sessions keyed by (user_id, chat_id)."""
+class _TurnQueue:
+    """Orders the requests in flight for one session."""
+
+    __slots__ = ("lock", "generation", "requests", "waiting")
 
     def __init__(self):
-        self._sessions: dict[tuple[int, int], GameSession] = {}
+        self.lock = asyncio.Lock()
+        # Bumped by every superseding request, so earlier ones can tell
+        self.generation = 0
+        self.requests = 0
+        # What the current turn is awaiting in supersedable(), if anything
+        self.waiting: Optional[asyncio.Future] = None
+
+
+class Turn:
+    """A request's exclusive hold on a session, from SessionManager.turn()."""
+
+    def __init__(self, session: GameSession, queue: _TurnQueue, generation: int):
+        self.session = session
+        self._queue = queue
+        self._generation = generation
+
+    @property
+    def superseded(self) -> bool:
+        """Whether a newer superseding request for the session has arrived."""
+        return self._queue.generation != self._generation
+
+    async def supersedable(self, awaitable: Awaitable[T]) -> T:
+        """
+        Await work whose result only matters to the latest request, such as
+        a suggestion. Raises RequestSuperseded, cancelling the work, if a
+        newer request for the session arrives first.
+        """
+        future = asyncio.ensure_future(awaitable)
+        if self.superseded:
+            future.cancel()
+            requests_superseded.inc()
+            raise RequestSuperseded()
+
+        self._queue.waiting = future
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Cancelled by a newer request rather than with this one
+            if self.superseded and not asyncio.current_task().cancelling():
+                requests_superseded.inc()
+                raise RequestSuperseded() from None
+            raise
+        finally:
+            self._queue.waiting = None
 
-    def get(self, user_id: int, chat_id: int) -> GameSession:
-        """Get or create a session for the user+chat pair."""
+
+class SessionManager:
+    """
+    Manages game sessions keyed by (user_id, chat_id).
+
+    Sessions live in a backend and are cached in memory, loaded on first
+    access. The cache holds at most max_sessions, evicting the least
+    recently used, and sweep() evicts sessions idle for longer than ttl
+    seconds. Call save() after changing a session so the backend stores it.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SessionBackend] = None,
+        max_sessions: int = SESSION_MAX,
+        ttl: float = SESSION_TTL,
+    ):
+        self.backend = backend if backend is not None else create_backend()
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # Least recently used first
+        self._sessions: OrderedDict[tuple[int, int], GameSession] = OrderedDict()
+        # Backend loads in flight, so concurrent gets share one session
+        self._loading: dict[tuple[int, int], asyncio.Future[GameSession]] = {}
+        # Turn order for sessions with requests in flight
+        self._turns: dict[tuple[int, int], _TurnQueue] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def start(self) -> None:
+        """Start the backend and the periodic sweep on the running loop."""
+        await self.backend.start()
+        self._sweeper = asyncio.create_task(self.run_sweeper())
+
+    async def close(self) -> None:
+        """Stop sweeping and persist every pending session."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        await self.backend.close()
+
+    async def get(self, user_id: int, chat_id: int) -> GameSession:
+        """Get, load or create the session for the user+chat pair."""
         key = (user_id, chat_id)
-        if key not in self._sessions:
-            self._sessions[key] = GameSession()
-        return self._sessions[key]
+        session = self._sessions.get(key)
+        if session is None:
+            session = await self._load(key)
+        else:
+            self._sessions.move_to_end(key)
+        session.last_active = time.monotonic()
+        return session
 
-    def reset(self, user_id: int, chat_id: int) -> int:
-        """Reset a session and return the number of guesses that were made."""
+    @asynccontextmanager
+    async def turn(
+        self, user_id: int, chat_id: int, supersede: bool = False
+    ) -> AsyncIterator[Turn]:
+        """
+        Hold the session for the user+chat pair while handling a request.
+
+        Requests for the same session take turns in arrival order, so one
+        never changes the session while another is using it. With
+        supersede, the request makes earlier ones stale: whatever they
+        await in Turn.supersedable() is cancelled, now or once they get
+        their turn. Only pass it for requests that will answer in their
+        place.
+        """
+        key = (user_id, chat_id)
+        queue = self._turns.get(key)
+        if queue is None:
+            queue = self._turns[key] = _TurnQueue()
+        if supersede:
+            queue.generation += 1
+            if queue.waiting is not None:
+                queue.waiting.cancel()
+        generation = queue.generation
+        queue.requests += 1
+
+        try:
+            async with queue.lock:
+                session = await self.get(user_id, chat_id)
+                yield Turn(session, queue, generation)
+        finally:
+            queue.requests -= 1
+            if queue.requests == 0:
+                del self._turns[key]
+
+    async def _load(self, key: tuple[int, int]) -> GameSession:
+        if key in self._loading:
+            return await self._loading[key]
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            stored = await self.backend.load(key)
+            session = GameSession.restore(stored) if stored else GameSession()
+            self._sessions[key] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            future.set_result(session)
+            return session
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters see the exception; don't also warn it was never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    def save(self, user_id: int, chat_id: int) -> None:
+        """Store the current state of a cached session in the backend."""
         key = (user_id, chat_id)
         if key in self._sessions:
-            count = self._sessions[key].reset()
-            return count
-        return 0
+            self.backend.save(key, self._sessions[key].store())
+
+    async def reset(self, user_id: int, chat_id: int) -> int:
+        """Reset a session and return the number of guesses that were made."""
+        session = await self.get(user_id, chat_id)
+        count = session.reset()
+        self.save(user_id, chat_id)
+        return count
+
+    def sweep(self, compact_after: float = SESSION_SWEEP_INTERVAL) -> int:
+        """
+        Evict sessions idle for longer than ttl, compact those idle for
+        longer than compact_after, and return the number evicted.
+        """
+        now = time.monotonic()
+        evicted = 0
+        # Oldest first, so expired sessions are all at the front
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_active <= self.ttl:
+                break
+            del self._sessions[key]
+            evicted += 1
+
+        for session in self._sessions.values():
+            if now - session.last_active < compact_after:
+                break
+            session.compact()
+        return evicted
+
+    async def run_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL) -> None:
+        """Sweep every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep(compact_after=interval)
+            await self.backend.expire(self.ttl)
 
 
 sessions = SessionManager()
+active_sessions.set_function(lambda: len(sessions))
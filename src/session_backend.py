@@ -0,0 +1,218 @@
+import asyncio
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple, Optional
+
+from src.logging import logger
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND") or "memory"
+SESSION_DB_PATH = Path(os.getenv("SESSION_DB_PATH") or "./data/sessions.db")
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL") or 1.0)
+
+SessionKey = tuple[int, int]
+
+
+class StoredSession(NamedTuple):
+    """A session's persisted state."""
+
+    strategy: str
+    # Packed guesses, as held by GameSession
+    guesses: bytes
+
+
+class SessionBackend(ABC):
+    """Durable storage behind SessionManager's in-memory sessions."""
+
+    async def start(self) -> None:
+        """Prepare the backend; called once the event loop is running."""
+
+    async def close(self) -> None:
+        """Persist anything pending and release resources."""
+
+    @abstractmethod
+    async def load(self, key: SessionKey) -> Optional[StoredSession]:
+        """Return the stored session, or None if there isn't one."""
+        ...
+
+    @abstractmethod
+    def save(self, key: SessionKey, session: StoredSession) -> None:
+        """Store a session. May return before it is written."""
+        ...
+
+    async def expire(self, ttl: float) -> int:
+        """Delete sessions not saved in the last ttl seconds; return how many."""
+        return 0
+
+
+class MemoryBackend(SessionBackend):
+    """Keeps nothing beyond the in-memory sessions; state is lost on restart."""
+
+    async def load(self, key: SessionKey) -> Optional[StoredSession]:
+        return None
+
+    def save(self, key: SessionKey, session: StoredSession) -> None:
+        pass
+
+
+class SQLiteBackend(SessionBackend):
+    """
+    Stores sessions in a local SQLite database, writing behind.
+
+    save() only records the latest state per session; a background task
+    writes everything recorded every flush_interval seconds in one
+    transaction, off the event loop. Several processes on one host can
+    share the database as long as each session is only used by one of
+    them at a time.
+    """
+
+    def __init__(
+        self,
+        path: Path = SESSION_DB_PATH,
+        flush_interval: float = SESSION_FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: dict[SessionKey, StoredSession] = {}
+        # The batch being written, still readable until it is committed
+        self._writing: dict[SessionKey, StoredSession] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        # The connection is used from worker threads, one at a time
+        self._lock = Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self._connect)
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    def _connect(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                strategy TEXT NOT NULL,
+                guesses BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (user_id, chat_id)
+            )
+            """)
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)"
+        )
+        connection.commit()
+        self._connection = connection
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            # Lets a flush in progress finish its write first
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def load(self, key: SessionKey) -> Optional[StoredSession]:
+        # Not written yet, but newer than what the database holds
+        if key in self._pending:
+            return self._pending[key]
+        if key in self._writing:
+            return self._writing[key]
+        return await asyncio.to_thread(self._read, key)
+
+    def _read(self, key: SessionKey) -> Optional[StoredSession]:
+        assert self._connection is not None, "SQLiteBackend has not been started"
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT strategy, guesses FROM sessions "
+                "WHERE user_id = ? AND chat_id = ?",
+                key,
+            ).fetchone()
+        return StoredSession(row[0], bytes(row[1])) if row is not None else None
+
+    def save(self, key: SessionKey, session: StoredSession) -> None:
+        self._pending[key] = session
+
+    async def flush(self) -> None:
+        """Write every pending session now."""
+        if not self._pending or self._connection is None:
+            return
+        batch, self._pending = self._pending, {}
+        self._writing = batch
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, batch))
+        # The write can't be stopped once its thread runs, so a cancelled
+        # flush still waits for it, then re-raises the cancellation
+        cancelled = False
+        while not write.done():
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                cancelled = True
+
+        try:
+            write.result()
+        except BaseException:
+            # Keep the batch for the next flush, unless saved again since
+            for key, session in batch.items():
+                self._pending.setdefault(key, session)
+            raise
+        finally:
+            self._writing = {}
+        if cancelled:
+            raise asyncio.CancelledError()
+
+    def _write(self, batch: dict[SessionKey, StoredSession]) -> None:
+        assert self._connection is not None
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO sessions (user_id, chat_id, strategy, guesses, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, chat_id) DO UPDATE SET "
+                "strategy = excluded.strategy, guesses = excluded.guesses, "
+                "updated_at = excluded.updated_at",
+                [
+                    (user_id, chat_id, session.strategy, session.guesses, now)
+                    for (user_id, chat_id), session in batch.items()
+                ],
+            )
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.error("session_flush_failed", error_message=str(e))
+
+    async def expire(self, ttl: float) -> int:
+        if self._connection is None:
+            return 0
+        return await asyncio.to_thread(self._delete_older_than, time.time() - ttl)
+
+    def _delete_older_than(self, cutoff: float) -> int:
+        assert self._connection is not None
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+
+def create_backend(kind: str = SESSION_BACKEND) -> SessionBackend:
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend()
+    raise ValueError(f"Unknown session backend: {kind}")
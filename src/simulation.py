@@ -0,0 +1,105 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from src.models import Guess
+from src.strategy import EntropyStrategy, MinimaxStrategy
+from src.strategy.base import Strategy
+from src.strategy.patterns import get_feedback_pattern
+
+MAX_GUESSES = 6
+
+STRATEGIES: dict[str, type[Strategy]] = {
+    "entropy": EntropyStrategy,
+    "minimax": MinimaxStrategy,
+}
+
+
+@dataclass
+class GameResult:
+    """Outcome of one simulated game."""
+
+    answer: str
+    guesses: list[Guess] = field(default_factory=list)
+    # Seconds each suggestion took, aligned with guesses
+    move_seconds: list[float] = field(default_factory=list)
+    solved: bool = False
+
+
+def latency_summary(seconds: list[float]) -> dict[str, float]:
+    """Summarize move times as mean, percentiles and max in milliseconds."""
+    if not seconds:
+        return {}
+    ms = np.array(seconds) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def parse_strategy_spec(spec: str) -> tuple[str, dict[str, Any]]:
+    """
+    Parse a strategy spec like "minimax:depth=1,prune_k=20" into the
+    strategy name and its constructor arguments.
+    """
+    name, _, raw_options = spec.partition(":")
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name}")
+
+    options: dict[str, Any] = {}
+    for option in filter(None, raw_options.split(",")):
+        key, _, value = option.partition("=")
+        if value == "none":
+            options[key] = None
+        else:
+            try:
+                options[key] = int(value)
+            except ValueError:
+                options[key] = float(value)
+    return name, options
+
+
+def make_strategy(spec: str, **config: Any) -> Strategy:
+    """Build the strategy a spec describes, with extra constructor arguments."""
+    name, options = parse_strategy_spec(spec)
+    return STRATEGIES[name](**config, **options)
+
+
+def play_game(
+    strategy: Strategy,
+    answer: str,
+    n: int = 3,
+    max_guesses: int = MAX_GUESSES,
+) -> GameResult:
+    """
+    Play one game against a known answer, always guessing the top suggestion.
+
+    Args:
+        strategy: Strategy to ask for suggestions
+        answer: Word to find
+        n: Suggestions requested per move, as the bot does
+        max_guesses: Guesses allowed before the game is lost
+    """
+    game = GameResult(answer=answer)
+    candidates = None
+
+    while len(game.guesses) < max_guesses:
+        start = time.perf_counter()
+        suggestions = strategy.execute(game.guesses, n=n, candidates=candidates)
+        game.move_seconds.append(time.perf_counter() - start)
+
+        word = suggestions[0]
+        guess = Guess(word, get_feedback_pattern(word, answer))
+        game.guesses.append(guess)
+        if guess.result == "11111":
+            game.solved = True
+            break
+        candidates = strategy.narrow_candidates(candidates, guess)
+
+    return game
@@ -1,17 +1,30 @@
+import os
 from abc import ABC, abstractmethod
-from collections import Counter
-from math import log2
-from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
+import numpy as np
+
+from src.exceptions import BotException
 from src.models import Guess
-from src.wordlist import load_wordlist
+from src.trace import count, current_trace, span, tracing
+from .patterns import PATTERN_COUNT, build_pattern_matrix, encode_pattern
+from .book import opening_book, strategy_key
+from .cache import fingerprint, result_cache
+from .engine import get_engine
+from .pool import DEFAULT_GUESS_POOL_FILTERS, GuessPoolFilter
+
+# Pattern-matrix elements processed per chunk when scoring guesses in bulk
+_SCORE_CHUNK_ELEMENTS = 1 << 21
 
-pattern_cache = {}
+SAMPLE_SIZE = int(os.environ["SAMPLE_SIZE"]) if os.getenv("SAMPLE_SIZE") else None
+SAMPLE_MASS = float(os.getenv("SAMPLE_MASS") or 1.0)
 
 
 class Strategy(ABC):
 
+    # Filters dropping guesses not worth scoring, applied in order; see pool.py
+    guess_pool_filters: tuple[GuessPoolFilter, ...] = DEFAULT_GUESS_POOL_FILTERS
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -22,112 +35,321 @@ class Strategy(ABC):
         self,
         filename: str = "normalized_scrabble_wordlist.csv",
         max_words: Optional[int] = None,
+        sample_size: Optional[int] = SAMPLE_SIZE,
+        sample_mass: float = SAMPLE_MASS,
     ) -> None:
-        self.wordlist = load_wordlist(
-            filename=Path(filename),
-            max_words=max_words,
-        )
+        """
+        Args:
+            filename: Wordlist CSV in wordlists/
+            max_words: Maximum number of words to load. None for all words.
+            sample_size: Score guesses against at most this many remaining
+                answers, the most frequent ones. None to always score exactly.
+            sample_mass: Stop sampling early once the sampled answers carry
+                this fraction of the remaining answers' total frequency.
+        """
+        self.filename = filename
+        self.max_words = max_words
+        self.sample_size = sample_size
+        self.sample_mass = sample_mass
+
+        # Wordlist data is shared, so strategies stay cheap to construct
+        self.engine = get_engine(filename, max_words)
+        self.words = self.engine.words
+        self.word_index = self.engine.word_index
+        self.wordlist_id = self.engine.wordlist_id
+        self.patterns = self.engine.patterns
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        """
+        Return the settings that affect this strategy's suggestions.
+        Subclasses add their extra constructor arguments.
+        """
+        return {"sample_size": self.sample_size, "sample_mass": self.sample_mass}
+
+    @property
+    def config(self) -> dict[str, Any]:
+        """Return the constructor arguments that recreate this strategy."""
+        return {
+            "filename": self.filename,
+            "max_words": self.max_words,
+            **self.parameters,
+        }
 
-    def _get_feedback_pattern(self, guess: str, answer: str) -> str:
+    def _sample_answers(self, possible_answers: np.ndarray) -> np.ndarray:
         """
-        Compute the feedback pattern for a guess against an answer.
-        Returns a string like "01210" where:
-          1 = correct position (green)
-          2 = wrong position (yellow)
-          0 = not in word (grey)
+        Return the answers to score guesses against: all of them if there
+        are at most sample_size, otherwise the most frequent ones, at
+        least two.
         """
-        cache_key = (guess, answer)
-        if cache_key in pattern_cache:
-            return pattern_cache[cache_key]
+        if self.sample_size is None or len(possible_answers) <= self.sample_size:
+            return possible_answers
 
-        result = ["0"] * 5
-        answer_letter_counts = Counter(answer)
+        frequencies = self.engine.frequencies[possible_answers]
+        order = np.argsort(-frequencies, kind="stable")
 
-        # First pass: mark greens (correct position)
-        for i, letter in enumerate(guess):
-            if letter == answer[i]:
-                result[i] = "1"
-                answer_letter_counts[letter] -= 1
+        size = self.sample_size
+        total_mass = frequencies.sum()
+        if self.sample_mass < 1 and total_mass > 0:
+            # Smallest top-frequency prefix carrying sample_mass of the total
+            cumulative_mass = np.cumsum(frequencies[order])
+            covered = np.searchsorted(cumulative_mass, self.sample_mass * total_mass)
+            size = min(size, int(covered) + 1)
+        # A single answer gets the same feedback from every guess, leaving
+        # nothing to rank guesses by
+        size = max(size, 2)
+
+        return np.sort(possible_answers[order[:size]])
+
+    def _reduce_guess_pool(
+        self,
+        possible_answers: np.ndarray,
+        filters: Optional[tuple[GuessPoolFilter, ...]] = None,
+    ) -> np.ndarray:
+        """
+        Return the wordlist indices of the guesses worth scoring against
+        possible_answers, in wordlist order. Each call adds to the trace's
+        guess_pool_calls, and the pool sizes before and after to
+        guess_pool_in and guess_pool_out.
 
-        # Second pass: mark yellows (wrong position)
-        for i, letter in enumerate(guess):
-            if result[i] == "0" and answer_letter_counts.get(letter, 0) > 0:
-                result[i] = "2"
-                answer_letter_counts[letter] -= 1
+        Args:
+            possible_answers: Wordlist indices of the remaining answers
+            filters: Filters to apply. None for guess_pool_filters.
+        """
+        if filters is None:
+            filters = self.guess_pool_filters
+        pool = np.arange(len(self.words), dtype=np.intp)
+        with span("guess_pool"):
+            for guess_pool_filter in filters:
+                pool = guess_pool_filter(self.engine, pool, possible_answers)
 
-        pattern = "".join(result)
-        pattern_cache[cache_key] = pattern
-        return pattern
+        count("guess_pool_calls")
+        count("guess_pool_in", len(self.words))
+        count("guess_pool_out", len(pool))
+        return pool
 
-    def _calculate_entropy(self, guess: str, possible_answers: list[str]) -> float:
+    def _calculate_entropies(
+        self, possible_answers: np.ndarray, guesses: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
-        Calculate the entropy (expected information gain) for a candidate guess.
-        Higher entropy = more evenly distributed feedback patterns = better guess.
+        Calculate the entropy of many candidate guesses at once.
+
+        Args:
+            possible_answers: Wordlist indices of the remaining answers
+            guesses: Wordlist indices of the guesses to score. None for all words.
+
+        Returns:
+            Array of entropies aligned with guesses.
         """
-        pattern_counts: Counter[str] = Counter()
-        for answer in possible_answers:
-            pattern = self._get_feedback_pattern(guess, answer)
-            pattern_counts[pattern] += 1
+        if guesses is None:
+            guesses = np.arange(len(self.words), dtype=np.intp)
+        count("guesses_scored", len(guesses))
 
         total = len(possible_answers)
-        entropy = 0.0
-        for count in pattern_counts.values():
-            probability = count / total
-            entropy -= probability * log2(probability)
+        # count * log2(count) for every count a pattern bucket can hold
+        counts_range = np.arange(total + 1, dtype=np.float64)
+        count_log_counts = counts_range * np.log2(np.maximum(counts_range, 1))
+
+        entropies = np.empty(len(guesses), dtype=np.float64)
+        # Never wider than the guesses, so small calls don't build huge offsets
+        chunk_size = max(1, min(_SCORE_CHUNK_ELEMENTS // total, len(guesses)))
+        offsets = np.arange(chunk_size, dtype=np.intp)[:, None] * PATTERN_COUNT
+
+        for start in range(0, len(guesses), chunk_size):
+            chunk = guesses[start : start + chunk_size]
+            rows = self.patterns[np.ix_(chunk, possible_answers)]
+
+            # Histogram of patterns per guess: one bincount over offset rows
+            buckets = (rows + offsets[: len(chunk)]).ravel()
+            pattern_counts = np.bincount(
+                buckets, minlength=len(chunk) * PATTERN_COUNT
+            ).reshape(len(chunk), PATTERN_COUNT)
+
+            # Sorted so equal partitions score identically whatever their patterns
+            pattern_counts.sort(axis=1)
+            weighted = count_log_counts[pattern_counts].sum(axis=1)
+            entropies[start : start + len(chunk)] = np.log2(total) - weighted / total
+
+        return entropies
 
-        return entropy
+    def _get_pattern_row(self, guess: str) -> np.ndarray:
+        """Return the pattern code of a guess against every word in the wordlist."""
+        index = self.word_index.get(guess)
+        if index is not None:
+            return self.patterns[index]
+        # Guesses outside the wordlist still constrain the answers
+        return build_pattern_matrix([guess], self.words)[0]
 
-    def _get_remaining_words(self, guesses: list[Guess]) -> list[tuple[str, float]]:
+    def narrow_candidates(
+        self, candidates: Optional[np.ndarray], guess: Guess
+    ) -> np.ndarray:
         """
-        Filter wordlist using previous guesses.
+        Narrow a remaining-candidate set by one more guess.
+
+        Args:
+            candidates: Sorted wordlist indices still possible. None for all words.
+            guess: The new guess and its feedback
+
+        Returns:
+            Sorted wordlist indices of the candidates consistent with the guess.
+        """
+        row = self._get_pattern_row(guess.word)
+        code = encode_pattern(guess.result)
+        if candidates is None:
+            return np.flatnonzero(row == code)
+        return candidates[row[candidates] == code]
+
+    def _get_remaining_words(self, guesses: list[Guess]) -> np.ndarray:
         """
-        candidates: list[tuple[str, float]] = []
-        for word, frequency in self.wordlist:
-            is_valid = True
-
-            for guess in guesses:
-                if not is_valid:
-                    break
-
-                letter_counts = Counter(word)
-
-                # First pass: check green letters (exact matches)
-                for i, letter in enumerate(guess.word):
-                    if guess.result[i] == "1":
-                        if word[i] != letter:
-                            is_valid = False
-                            break
-                        letter_counts[letter] -= 1
-
-                if not is_valid:
-                    continue
-
-                # Second pass: check yellow and grey letters
-                for i, letter in enumerate(guess.word):
-                    if guess.result[i] == "2":
-                        # Letter exists but not in this position
-                        if word[i] == letter:
-                            is_valid = False
-                            break
-                        if letter_counts.get(letter, 0) <= 0:
-                            is_valid = False
-                            break
-                        letter_counts[letter] -= 1
-
-                    elif guess.result[i] == "0":
-                        # If we have unaccounted instances of this letter, it's incompatible
-                        if letter_counts.get(letter, 0) > 0:
-                            is_valid = False
-                            break
-
-            if is_valid:
-                candidates.append((word, frequency))
+        Filter wordlist using previous guesses.
 
+        Returns:
+            Sorted wordlist indices of the words consistent with every guess.
+        """
+        candidates = np.arange(len(self.words), dtype=np.intp)
+        for guess in guesses:
+            candidates = self.narrow_candidates(candidates, guess)
         return candidates
 
+    def execute(
+        self,
+        guesses: list[Guess],
+        n: int = 1,
+        candidates: Optional[np.ndarray] = None,
+    ) -> list[str]:
+        """
+        Return the top n suggested guesses, from the opening book if it
+        covers this position or from the result cache if this set of
+        remaining answers was seen before.
+
+        Args:
+            guesses: Guesses made so far
+            n: Number of suggestions to return
+            candidates: Remaining answers already narrowed by the caller.
+                None to recompute them from guesses.
+        """
+        if candidates is None:
+            with span("remaining_words"):
+                candidates = self._get_remaining_words(guesses)
+
+        suggestions = self.lookup(guesses, n, candidates)
+        if suggestions is None:
+            suggestions, search_trace = self.traced_suggest(guesses, n, candidates)
+            if self.complete(search_trace["counters"]):
+                self.remember(guesses, n, candidates, suggestions)
+        return suggestions
+
+    def traced_suggest(
+        self,
+        guesses: list[Guess],
+        n: int = 1,
+        candidates: Optional[np.ndarray] = None,
+    ) -> tuple[list[str], dict[str, Any]]:
+        """
+        Run suggest in a trace of its own, returned with the suggestions
+        (see Trace.to_dict) and added to the current trace if there is one.
+        """
+        outer = current_trace()
+        with tracing(True) as trace:
+            suggestions = self.suggest(guesses, n, candidates)
+        assert trace is not None
+        search_trace = trace.to_dict()
+        if outer is not None:
+            outer.merge(search_trace)
+        return suggestions, search_trace
+
+    def complete(self, counters: dict[str, float]) -> bool:
+        """
+        Whether a search that recorded these trace counters ran in full, so
+        its suggestions can be cached. A search cut short, e.g. by a time
+        budget, would otherwise keep answering later identical requests.
+        """
+        return True
+
+    def lookup(
+        self,
+        guesses: list[Guess],
+        n: int = 1,
+        candidates: Optional[np.ndarray] = None,
+    ) -> Optional[list[str]]:
+        """
+        Return suggestions from the opening book or result cache without
+        searching, or None if neither covers this position.
+        """
+        booked = opening_book.lookup(self, guesses, n)
+        if booked is not None:
+            count("book_hits")
+            return booked
+
+        cached = result_cache.get(self.result_key(guesses, n, candidates))
+        if cached is not None:
+            count("result_cache_hits")
+            return list(cached)
+        count("result_cache_misses")
+        return None
+
+    def remember(
+        self,
+        guesses: list[Guess],
+        n: int,
+        candidates: Optional[np.ndarray],
+        suggestions: list[str],
+    ) -> None:
+        """Store computed suggestions of a complete search in the result cache."""
+        result_cache.put(self.result_key(guesses, n, candidates), list(suggestions))
+
+    def result_key(
+        self, guesses: list[Guess], n: int, candidates: Optional[np.ndarray]
+    ) -> tuple[str, bytes, int]:
+        """Key identifying a search's result: strategy, remaining answers, n."""
+        if candidates is None:
+            candidates = self._get_remaining_words(guesses)
+        return (strategy_key(self), fingerprint(candidates), n)
+
+    def estimate_cost(self, remaining: int) -> float:
+        """
+        Roughly estimate the work of a search over remaining answers, in
+        feedback patterns looked up, to schedule it before running it.
+        """
+        if self.sample_size is not None:
+            remaining = min(remaining, self.sample_size)
+        # Every guess in the wordlist scored against every remaining answer
+        return float(len(self.words) * remaining)
+
+    def downgrade(self) -> Optional["Strategy"]:
+        """Return a cheaper variant to fall back on under load, if any."""
+        return None
+
+    def suggest(
+        self,
+        guesses: list[Guess],
+        n: int = 1,
+        candidates: Optional[np.ndarray] = None,
+    ) -> list[str]:
+        """
+        Compute the top n suggested guesses.
+
+        Args:
+            guesses: Guesses made so far
+            n: Number of suggestions to return
+            candidates: Remaining answers already narrowed by the caller.
+                None to recompute them from guesses.
+        """
+        if candidates is None:
+            with span("remaining_words"):
+                candidates = self._get_remaining_words(guesses)
+        count("candidates", len(candidates))
+        if len(candidates) == 0:
+            raise BotException("No known remaining words")
+        if len(candidates) == 1:
+            return [self.words[candidates[0]]]
+
+        with span("rank"):
+            return self._rank(candidates, n)
+
     @abstractmethod
-    def execute(self, guesses: list[Guess], n: int = 1) -> list[str]:
+    def _rank(self, possible_answers: np.ndarray, n: int) -> list[str]:
         """
-        Return the top n suggested guesses.
+        Return the top n guesses for at least two remaining answers.
         """
         ...
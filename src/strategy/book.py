@@ -0,0 +1,72 @@
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from src.models import Guess
+from .patterns import PATTERN_CACHE_DIR
+
+if TYPE_CHECKING:
+    from .base import Strategy
+
+BOOK_FORMAT_VERSION = 1
+OPENING_BOOK_PATH = Path(
+    os.getenv("OPENING_BOOK_PATH") or PATTERN_CACHE_DIR / "opening_book.json"
+)
+
+
+def strategy_key(strategy: "Strategy") -> str:
+    """Identify a strategy configuration and the wordlist it plays with."""
+    parameters = json.dumps(strategy.parameters, sort_keys=True)
+    return f"{strategy.name}|{parameters}|{strategy.wordlist_id}"
+
+
+def history_key(guesses: list[Guess]) -> str:
+    """Identify a guess history, e.g. "SLATE:00200,CRONY:02000"."""
+    return ",".join(f"{guess.word}:{guess.result}" for guess in guesses)
+
+
+class OpeningBook:
+    """
+    Precomputed suggestions for the first plies of a game, keyed by
+    strategy configuration, wordlist and guess history.
+    """
+
+    def __init__(self, path: Path = OPENING_BOOK_PATH):
+        self.path = path
+        self.lines: dict[str, dict[str, list[str]]] = {}
+
+        if path.exists():
+            with open(path) as f:
+                book = json.load(f)
+            if book.get("version") == BOOK_FORMAT_VERSION:
+                self.lines = book["lines"]
+
+    def lookup(
+        self, strategy: "Strategy", guesses: list[Guess], n: int
+    ) -> Optional[list[str]]:
+        """Return booked suggestions, or None if this position isn't covered."""
+        lines = self.lines.get(strategy_key(strategy))
+        if lines is None:
+            return None
+
+        suggestions = lines.get(history_key(guesses))
+        if suggestions is None or len(suggestions) < n:
+            return None
+        return suggestions[:n]
+
+    def add(
+        self, strategy: "Strategy", guesses: list[Guess], suggestions: list[str]
+    ) -> None:
+        lines = self.lines.setdefault(strategy_key(strategy), {})
+        lines[history_key(guesses)] = suggestions
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": BOOK_FORMAT_VERSION, "lines": self.lines}, f)
+        os.replace(tmp_path, self.path)
+
+
+opening_book = OpeningBook()
@@ -0,0 +1,70 @@
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Generic, Hashable, Optional, TypeVar
+
+import numpy as np
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded, thread-safe mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return size and hit/miss/eviction counters for sizing the cache."""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def fingerprint(indices: np.ndarray) -> bytes:
+    """Return a compact digest identifying a sorted set of wordlist indices."""
+    data = np.ascontiguousarray(indices, dtype=np.intp).tobytes()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE") or 1024)
+
+# Suggestions keyed by strategy configuration, wordlist and remaining answers
+result_cache: LRUCache[tuple, list[str]] = LRUCache(RESULT_CACHE_SIZE)
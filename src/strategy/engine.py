@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import numpy as np
+
+from src.wordlist import load_wordlist
+from .patterns import encode_words, load_pattern_matrix, wordlist_hash
+
+
+@dataclass(frozen=True)
+class WordEngine:
+    """
+    Immutable wordlist data shared by every strategy that plays with it.
+
+    Attributes:
+        words: Words in wordlist order; indices elsewhere refer to this order
+        frequencies: Read-only normalized frequency of each word
+        word_index: Position of each word in words
+        wordlist_id: Content hash of words
+        patterns: Read-only (guesses, answers) matrix of encoded feedback patterns
+        letters: Read-only (words, 5) array of letters as 0-25
+        letter_counts: Read-only (words, 26) array of each letter's count per word
+    """
+
+    words: tuple[str, ...]
+    frequencies: np.ndarray
+    word_index: Mapping[str, int]
+    wordlist_id: str
+    patterns: np.ndarray
+    letters: np.ndarray
+    letter_counts: np.ndarray
+
+
+_engines: dict[tuple[str, Optional[int]], WordEngine] = {}
+_engines_lock = Lock()
+
+
+def get_engine(filename: str, max_words: Optional[int] = None) -> WordEngine:
+    """Return the shared engine for a wordlist, loading it on first use."""
+    key = (filename, max_words)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = _load_engine(filename, max_words)
+        return _engines[key]
+
+
+def _load_engine(filename: str, max_words: Optional[int]) -> WordEngine:
+    wordlist = load_wordlist(filename=Path(filename), max_words=max_words)
+    words = tuple(word for word, _ in wordlist)
+
+    frequencies = np.array([frequency for _, frequency in wordlist], dtype=np.float64)
+    frequencies.flags.writeable = False
+
+    letters = encode_words(words) - ord("A")
+    letters.flags.writeable = False
+
+    letter_counts = np.zeros((len(words), 26), dtype=np.uint8)
+    for position in range(5):
+        np.add.at(letter_counts, (np.arange(len(words)), letters[:, position]), 1)
+    letter_counts.flags.writeable = False
+
+    return WordEngine(
+        words=words,
+        frequencies=frequencies,
+        word_index=MappingProxyType({word: i for i, word in enumerate(words)}),
+        wordlist_id=wordlist_hash(words),
+        patterns=load_pattern_matrix(words),
+        letters=letters,
+        letter_counts=letter_counts,
+    )
@@ -1,37 +1,32 @@
-from src.exceptions import BotException
-from src.models import Guess
+import numpy as np
+
+from src.trace import span
 from .base import Strategy
 
 
 class EntropyStrategy(Strategy):
     """
     Use information theory to maximize information gain (bits) for each guess.
-    Calculates expected bits for every known word, using whether it is still a
-    possible answer as a tiebreaker.
+    Calculates expected bits for every known word that can narrow the answers,
+    using whether it is still a possible answer as a tiebreaker.
     """
 
     @property
     def name(self) -> str:
         return "Entropy"
 
-    def execute(self, guesses: list[Guess], n: int = 1) -> list[str]:
-        remaining_words = self._get_remaining_words(guesses)
-        if len(remaining_words) == 0:
-            raise BotException("No known remaining words")
-        if len(remaining_words) == 1:
-            return [remaining_words[0][0]]
-
-        possible_answers = [word for word, _ in remaining_words]
-        possible_set = set(possible_answers)
+    def _rank(self, possible_answers: np.ndarray, n: int) -> list[str]:
+        # Estimated over the most frequent answers when there are too many
+        # to score exactly
+        scored_answers = self._sample_answers(possible_answers)
 
-        # Calculate entropy for all candidates and rank them
-        scored: list[tuple[str, float, bool]] = []
-        for candidate, _ in self.wordlist:
-            entropy = self._calculate_entropy(candidate, possible_answers)
-            is_possible = candidate in possible_set
-            scored.append((candidate, entropy, is_possible))
+        # Calculate entropy for every guess worth scoring and rank them
+        pool = self._reduce_guess_pool(scored_answers)
+        is_possible = np.isin(pool, possible_answers)
+        with span("entropy_scoring"):
+            entropies = self._calculate_entropies(scored_answers, pool)
 
         # Sort by entropy (desc), then by is_possible (True first)
-        scored.sort(key=lambda x: (-x[1], not x[2]))
+        ranking = np.lexsort((~is_possible, -entropies))
 
-        return [word for word, _, _ in scored[:n]]
+        return [self.words[pool[candidate]] for candidate in ranking[:n]]
@@ -1,10 +1,98 @@
-from collections import defaultdict
-from math import log2
-from typing import Optional
+import heapq
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from math import fsum, log2
+from typing import Any, Optional
 
-from src.exceptions import BotException
-from src.models import Guess
-from src.strategy.base import Strategy
+import numpy as np
+
+from src.strategy.base import SAMPLE_MASS, SAMPLE_SIZE, Strategy
+from src.trace import count, current_trace, span, tracing
+from .cache import LRUCache, fingerprint
+from .patterns import SOLVED_PATTERN
+from .pool import SEARCH_GUESS_POOL_FILTERS, GuessPoolFilter
+
+INFINITY = float("inf")
+
+# Slack on bound comparisons so rounding never prunes an equally good guess
+_BOUND_TOLERANCE = 1e-9
+
+MINIMAX_WORKERS = int(os.getenv("MINIMAX_WORKERS") or 1)
+MINIMAX_TABLE_SIZE = int(os.getenv("MINIMAX_TABLE_SIZE") or 100_000)
+MINIMAX_TIME_BUDGET = (
+    float(os.environ["MINIMAX_TIME_BUDGET"])
+    if os.getenv("MINIMAX_TIME_BUDGET")
+    else None
+)
+
+# Transposition tables shared by every MinimaxStrategy in the process:
+# best expected guesses keyed by (wordlist, prune_k, answers, depth), and
+# pruned candidates keyed by (wordlist, prune_k, answers, within a search)
+expected_table: LRUCache[tuple[str, int, bytes, int], float] = LRUCache(
+    MINIMAX_TABLE_SIZE
+)
+candidate_table: LRUCache[tuple[str, int, bytes, bool], list[int]] = LRUCache(
+    MINIMAX_TABLE_SIZE
+)
+
+# Search pools shared by every MinimaxStrategy, keyed by worker count
+_pools: dict[int, ProcessPoolExecutor] = {}
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+def _evaluate_in_worker(
+    config: dict[str, Any],
+    candidates: list[int],
+    possible_answers: np.ndarray,
+    n: int,
+    depth: int,
+    deadline: Optional[float],
+    traced: bool,
+) -> tuple[list[float], "SearchStats", Optional[dict[str, Any]]]:
+    # Construction is cheap: the wordlist engine is loaded once per process
+    strategy = MinimaxStrategy(**{**config, "workers": 1})
+    state = SearchState(deadline)
+    with tracing(traced) as trace:
+        expected_values = strategy._evaluate_candidates(
+            candidates, possible_answers, n, depth, state
+        )
+    # Traces don't cross processes; the caller merges this one into its own
+    return expected_values, state.stats, trace.to_dict() if trace else None
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside a search when its time budget runs out."""
+
+
+@dataclass
+class SearchStats:
+    """Node counts for one Minimax search."""
+
+    # Guesses whose expected guesses were evaluated
+    nodes: int = 0
+    # Evaluations abandoned because they were proven worse than a bound
+    pruned: int = 0
+    # Deepest search that finished; shallower than depth if time ran out
+    completed_depth: int = 0
+
+
+@dataclass
+class SearchState:
+    """
+    State of one search, passed down its recursion rather than kept on the
+    strategy, which concurrent searches share.
+    """
+
+    # time.monotonic() after which the search gives up, if any
+    deadline: Optional[float] = None
+    stats: SearchStats = field(default_factory=SearchStats)
 
 
 class MinimaxStrategy(Strategy):
@@ -16,9 +104,22 @@ class MinimaxStrategy(Strategy):
     - depth=1: One level of lookahead, then heuristic
     - depth=2+: Deeper recursive search (expensive)
 
-    Uses entropy-based pruning to limit candidates at each recursive level.
+    Uses entropy-based pruning to limit candidates at each recursive level,
+    and branch-and-bound to abandon guesses proven worse than the best found.
+    With workers > 1, top-level candidates of a depth>=1 search are split
+    across a process pool; results are identical to the serial search.
+
+    With sample_size set, large answer sets are searched through their most
+    frequent answers only (see Strategy).
+
+    With a time_budget (seconds), the search deepens iteratively from
+    depth 0 up to depth and returns the ranking of the deepest search that
+    finished within the budget. Depth 0 always finishes.
     """
 
+    # Filters for the guesses tried below the top level, see pool.py
+    search_pool_filters: tuple[GuessPoolFilter, ...] = SEARCH_GUESS_POOL_FILTERS
+
     @property
     def name(self) -> str:
         return "Minimax"
@@ -29,40 +130,105 @@ class MinimaxStrategy(Strategy):
         max_words: Optional[int] = None,
         depth: int = 0,
         prune_k: int = 50,
+        workers: int = MINIMAX_WORKERS,
+        time_budget: Optional[float] = MINIMAX_TIME_BUDGET,
+        sample_size: Optional[int] = SAMPLE_SIZE,
+        sample_mass: float = SAMPLE_MASS,
     ) -> None:
-        super().__init__(filename=filename, max_words=max_words)
+        super().__init__(
+            filename=filename,
+            max_words=max_words,
+            sample_size=sample_size,
+            sample_mass=sample_mass,
+        )
         self.depth = depth
         self.prune_k = prune_k
+        self.workers = workers
+        self.time_budget = time_budget
+        self._downgraded: Optional[MinimaxStrategy] = None
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return {
+            **super().parameters,
+            "depth": self.depth,
+            "prune_k": self.prune_k,
+            "time_budget": self.time_budget,
+        }
+
+    @property
+    def config(self) -> dict[str, Any]:
+        # Worker count doesn't change results, so it isn't a parameter
+        return {**super().config, "workers": self.workers}
+
+    def estimate_cost(self, remaining: int) -> float:
+        # Each level of lookahead scores the prune_k best guesses again
+        # within every subtree, whose answers add up to the remaining ones
+        return super().estimate_cost(remaining) * (1 + self.prune_k) ** self.depth
+
+    def complete(self, counters: dict[str, float]) -> bool:
+        # Shallower than depth when the time budget ran out
+        return counters.get("completed_depth", self.depth) >= self.depth
+
+    def downgrade(self) -> Optional[Strategy]:
+        if self.depth == 0:
+            return None
+        if self._downgraded is None:
+            self._downgraded = MinimaxStrategy(**{**self.config, "depth": 0})
+        return self._downgraded
 
     def _group_by_pattern(
-        self, guess: str, possible_answers: list[str]
-    ) -> dict[str, list[str]]:
+        self, guess: int, possible_answers: np.ndarray
+    ) -> dict[int, np.ndarray]:
         """Group possible answers by the feedback pattern they would produce."""
-        groups: dict[str, list[str]] = defaultdict(list)
-        for answer in possible_answers:
-            pattern = self._get_feedback_pattern(guess, answer)
-            groups[pattern].append(answer)
-        return groups
+        patterns = self.patterns[guess, possible_answers]
+        order = np.argsort(patterns, kind="stable")
+        codes, starts = np.unique(patterns[order], return_index=True)
+        groups = np.split(possible_answers[order], starts[1:])
+        return dict(zip(codes.tolist(), groups))
 
     def _get_top_entropy_candidates(
-        self, possible_answers: list[str], k: int
-    ) -> list[str]:
-        """Get top-k candidates by entropy for pruning."""
-        scored: list[tuple[str, float]] = []
-        for candidate, _ in self.wordlist:
-            entropy = self._calculate_entropy(candidate, possible_answers)
-            scored.append((candidate, entropy))
+        self, possible_answers: np.ndarray, k: int, in_search: bool = False
+    ) -> list[int]:
+        """
+        Get top-k candidates by entropy for pruning. Within a search, only
+        one guess per partition of the answers is kept, as the others can't
+        change the best expected guesses.
+        """
+        key = (self.wordlist_id, k, fingerprint(possible_answers), in_search)
+        candidates = candidate_table.get(key)
+        if candidates is None:
+            filters = self.search_pool_filters if in_search else None
+            pool = self._reduce_guess_pool(possible_answers, filters)
+            entropies = self._calculate_entropies(possible_answers, pool)
+            candidates = pool[np.argsort(-entropies, kind="stable")[:k]].tolist()
+            candidate_table.put(key, candidates)
+        return candidates
 
-        scored.sort(key=lambda x: -x[1])
-        return [word for word, _ in scored[:k]]
+    def _lower_bound(self, size: int, depth: int) -> float:
+        """
+        Admissible lower bound on _expected_guesses for a group of this size.
+
+        Every unsolved answer costs at least one more guess, and at most one
+        answer can be solved by the next guess itself.
+        """
+        if size <= 1:
+            return size
+        if depth == 0:
+            return log2(size)
+        return 2 - 1 / size
 
     def _expected_guesses(
         self,
-        possible_answers: list[str],
+        possible_answers: np.ndarray,
         depth: int,
+        state: SearchState,
+        bound: float = INFINITY,
     ) -> float:
         """
         Calculate the minimum expected guesses to solve from this state.
+
+        Returns INFINITY instead if the minimum is proven to exceed bound.
         """
         if len(possible_answers) == 0:
             return 0
@@ -73,61 +239,234 @@ class MinimaxStrategy(Strategy):
         if depth == 0:
             return log2(len(possible_answers))
 
-        # Prune: only try top-K candidates by entropy
-        candidates = self._get_top_entropy_candidates(possible_answers, self.prune_k)
+        # Different guesses often leave the same answers: reuse solved subproblems
+        key = (self.wordlist_id, self.prune_k, fingerprint(possible_answers), depth)
+        best_expected = expected_table.get(key)
+        if best_expected is not None:
+            return best_expected
 
-        best_expected = float("inf")
+        # Prune: only try top-K candidates by entropy, best first so the
+        # bound tightens early
+        candidates = self._get_top_entropy_candidates(
+            possible_answers, self.prune_k, in_search=True
+        )
+
+        best_expected = INFINITY
         for candidate in candidates:
             expected = self._expected_guesses_for_guess(
-                candidate, possible_answers, depth
+                candidate,
+                possible_answers,
+                depth - 1,
+                state,
+                min(bound, best_expected),
             )
             best_expected = min(best_expected, expected)
 
+        # Only exact values are stored; INFINITY just means "worse than bound"
+        if best_expected < INFINITY:
+            expected_table.put(key, best_expected)
         return best_expected
 
     def _expected_guesses_for_guess(
         self,
-        guess: str,
-        possible_answers: list[str],
+        guess: int,
+        possible_answers: np.ndarray,
         depth: int,
+        state: SearchState,
+        bound: float = INFINITY,
     ) -> float:
-        """Calculate expected guesses if we make this guess."""
+        """
+        Calculate expected guesses if we make this guess, searching each
+        resulting group with the given remaining depth.
+
+        Returns INFINITY instead as soon as the expected guesses are proven
+        to exceed bound.
+        """
+        if state.deadline is not None and time.monotonic() > state.deadline:
+            raise DeadlineExceeded()
+
+        state.stats.nodes += 1
         groups = self._group_by_pattern(guess, possible_answers)
         total = len(possible_answers)
-        expected = 0.0
 
+        terms: dict[int, float] = {}
         for pattern, group in groups.items():
             probability = len(group) / total
-
-            if pattern == "11111":
+            if pattern == SOLVED_PATTERN:
                 # Correct guess - costs 1 guess
-                expected += probability * 1
+                terms[pattern] = probability * 1
             else:
-                # Recurse with reduced depth
-                expected += probability * (1 + self._expected_guesses(group, depth - 1))
+                lower_bound = self._lower_bound(len(group), depth)
+                terms[pattern] = probability * (1 + lower_bound)
+
+        # Exact terms replace lower bounds as groups are searched, largest
+        # first, so a losing guess is abandoned as early as possible
+        estimate = sum(terms.values())
+        for pattern, group in sorted(groups.items(), key=lambda x: -len(x[1])):
+            if estimate > bound + _BOUND_TOLERANCE:
+                state.stats.pruned += 1
+                return INFINITY
+            if pattern == SOLVED_PATTERN or len(group) == 1 or depth == 0:
+                continue
 
-        return expected
+            probability = len(group) / total
+            group_bound = (bound - (estimate - terms[pattern])) / probability - 1
+            expected = self._expected_guesses(group, depth, state, group_bound)
+            if expected == INFINITY:
+                state.stats.pruned += 1
+                return INFINITY
 
-    def execute(self, guesses: list[Guess], n: int = 1) -> list[str]:
-        remaining_words = self._get_remaining_words(guesses)
-        if len(remaining_words) == 0:
-            raise BotException("No known remaining words")
-        if len(remaining_words) == 1:
-            return [remaining_words[0][0]]
+            exact = probability * (1 + expected)
+            estimate += exact - terms[pattern]
+            terms[pattern] = exact
 
-        possible_answers = [word for word, _ in remaining_words]
-        possible_set = set(possible_answers)
+        if estimate > bound + _BOUND_TOLERANCE:
+            state.stats.pruned += 1
+            return INFINITY
 
-        # Prune candidates at top level using entropy heuristic
-        candidates = self._get_top_entropy_candidates(possible_answers, self.prune_k)
+        # fsum is order-independent, so equally good guesses tie exactly
+        return fsum(terms.values())
 
-        scored: list[tuple[str, float, bool]] = []
+    def _evaluate_candidates(
+        self,
+        candidates: list[int],
+        possible_answers: np.ndarray,
+        n: int,
+        depth: int,
+        state: SearchState,
+    ) -> list[float]:
+        """
+        Expected guesses for each top-level candidate, searched serially.
+
+        Candidates that can't make the top n are reported as INFINITY.
+        Raises DeadlineExceeded if the search passes its deadline.
+        """
+        expected_values: list[float] = []
         for candidate in candidates:
-            expected = self._expected_guesses_for_guess(
-                candidate, possible_answers, self.depth
+            # Anything worse than the current n-th best can't be suggested
+            top = heapq.nsmallest(n, expected_values)
+            bound = top[-1] if len(top) == n else INFINITY
+            expected_values.append(
+                self._expected_guesses_for_guess(
+                    candidate, possible_answers, depth, state, bound
+                )
             )
+        return expected_values
+
+    def _evaluate_candidates_parallel(
+        self,
+        candidates: list[int],
+        possible_answers: np.ndarray,
+        n: int,
+        depth: int,
+        state: SearchState,
+    ) -> list[float]:
+        """
+        Expected guesses for each top-level candidate, with the candidates
+        split into one contiguous chunk per worker.
+
+        Each chunk keeps its own top n exact, so the overall top n is too.
+        """
+        trace = current_trace()
+        pool = _get_pool(self.workers)
+        chunk_size = -(-len(candidates) // self.workers)
+        futures = [
+            pool.submit(
+                _evaluate_in_worker,
+                self.config,
+                candidates[start : start + chunk_size],
+                possible_answers,
+                n,
+                depth,
+                state.deadline,
+                trace is not None,
+            )
+            for start in range(0, len(candidates), chunk_size)
+        ]
+
+        expected_values: list[float] = []
+        for future in futures:
+            chunk_values, chunk_stats, chunk_trace = future.result()
+            expected_values.extend(chunk_values)
+            if trace is not None and chunk_trace is not None:
+                trace.merge(chunk_trace)
+            state.stats.nodes += chunk_stats.nodes
+            state.stats.pruned += chunk_stats.pruned
+        return expected_values
+
+    def _search(
+        self,
+        candidates: list[int],
+        possible_answers: np.ndarray,
+        n: int,
+        depth: int,
+        state: SearchState,
+    ) -> list[float]:
+        if self.workers > 1 and depth > 0:
+            return self._evaluate_candidates_parallel(
+                candidates, possible_answers, n, depth, state
+            )
+        return self._evaluate_candidates(candidates, possible_answers, n, depth, state)
+
+    def _deepen(
+        self,
+        candidates: list[int],
+        possible_answers: np.ndarray,
+        n: int,
+        stats: SearchStats,
+    ) -> list[float]:
+        if self.time_budget is None:
+            state = SearchState(stats=stats)
+            expected_values = self._search(
+                candidates, possible_answers, n, self.depth, state
+            )
+            stats.completed_depth = self.depth
+            return expected_values
+
+        # Iterative deepening: keep the deepest ranking finished in time.
+        # Depth 0 always finishes, so it runs without the deadline.
+        deadline = time.monotonic() + self.time_budget
+        expected_values = self._search(
+            candidates, possible_answers, n, 0, SearchState(stats=stats)
+        )
+        for depth in range(1, self.depth + 1):
+            try:
+                expected_values = self._search(
+                    candidates, possible_answers, n, depth, SearchState(deadline, stats)
+                )
+            except DeadlineExceeded:
+                break
+            stats.completed_depth = depth
+        return expected_values
+
+    def _rank(self, possible_answers: np.ndarray, n: int) -> list[str]:
+        possible_set = set(possible_answers.tolist())
+
+        # Search over the most frequent answers when there are too many
+        possible_answers = self._sample_answers(possible_answers)
+
+        # Prune candidates at top level using entropy heuristic
+        with span("candidate_selection"):
+            candidates = self._get_top_entropy_candidates(
+                possible_answers, self.prune_k
+            )
+
+        stats = SearchStats()
+        table_hits, table_misses = expected_table.hits, expected_table.misses
+        with span("search"):
+            expected_values = self._deepen(candidates, possible_answers, n, stats)
+
+        count("nodes", stats.nodes)
+        count("pruned", stats.pruned)
+        count("requested_depth", self.depth)
+        count("completed_depth", stats.completed_depth)
+        count("table_hits", expected_table.hits - table_hits)
+        count("table_misses", expected_table.misses - table_misses)
+
+        scored: list[tuple[str, float, bool]] = []
+        for candidate, expected in zip(candidates, expected_values):
             is_possible = candidate in possible_set
-            scored.append((candidate, expected, is_possible))
+            scored.append((self.words[candidate], expected, is_possible))
 
         # Sort by expected guesses (asc), then by is_possible (True first as tiebreaker)
         scored.sort(key=lambda x: (x[1], not x[2]))
@@ -0,0 +1,173 @@
+import hashlib
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+# Feedback patterns are encoded as base-3 integers, reading the pattern string
+# ("01210") left to right as digits. There are 3^5 = 243 possible patterns, so
+# every code fits in a uint8.
+PATTERN_COUNT = 3**5
+PATTERN_DTYPE = np.uint8
+
+# Number of guess rows computed per chunk when building a matrix. Bounds the
+# size of the intermediate (chunk, answers, 5) boolean arrays.
+_BUILD_CHUNK_SIZE = 64
+
+# Persisted matrices are named by format version and wordlist hash, so a
+# changed wordlist or encoding never loads a stale file.
+MATRIX_FORMAT_VERSION = 1
+PATTERN_CACHE_DIR = Path(os.getenv("PATTERN_CACHE_DIR") or "./cache")
+
+_PLACE_VALUES = np.array([3**4, 3**3, 3**2, 3**1, 3**0], dtype=np.int64)
+
+
+def get_feedback_pattern(guess: str, answer: str) -> str:
+    """
+    Compute the feedback pattern for a guess against an answer.
+    Returns a string like "01210" where:
+      1 = correct position (green)
+      2 = wrong position (yellow)
+      0 = not in word (grey)
+    """
+    result = ["0"] * 5
+    answer_letter_counts = Counter(answer)
+
+    # First pass: mark greens (correct position)
+    for i, letter in enumerate(guess):
+        if letter == answer[i]:
+            result[i] = "1"
+            answer_letter_counts[letter] -= 1
+
+    # Second pass: mark yellows (wrong position)
+    for i, letter in enumerate(guess):
+        if result[i] == "0" and answer_letter_counts.get(letter, 0) > 0:
+            result[i] = "2"
+            answer_letter_counts[letter] -= 1
+
+    return "".join(result)
+
+
+def encode_pattern(pattern: str) -> int:
+    """Encode a feedback pattern string like "01210" as an integer code."""
+    code = 0
+    for digit in pattern:
+        code = code * 3 + int(digit)
+    return code
+
+
+def decode_pattern(code: int) -> str:
+    """Decode an integer code back into its feedback pattern string."""
+    digits = []
+    for _ in range(5):
+        code, digit = divmod(code, 3)
+        digits.append(str(digit))
+    return "".join(reversed(digits))
+
+
+SOLVED_PATTERN = encode_pattern("11111")
+
+
+def encode_words(words: Sequence[str]) -> np.ndarray:
+    """Encode 5-letter ASCII words as an (n, 5) uint8 array of letter bytes."""
+    return np.frombuffer("".join(words).encode("ascii"), dtype=np.uint8).reshape(-1, 5)
+
+
+def build_pattern_matrix(guesses: Sequence[str], answers: Sequence[str]) -> np.ndarray:
+    """
+    Build the (guesses, answers) matrix of encoded feedback patterns.
+
+    Entry [g, a] is the code of get_feedback_pattern(guesses[g], answers[a]).
+    """
+    guess_letters = encode_words(guesses)
+    answer_letters = encode_words(answers)
+    matrix = np.empty((len(guesses), len(answers)), dtype=PATTERN_DTYPE)
+
+    for start in range(0, len(guesses), _BUILD_CHUNK_SIZE):
+        chunk = guess_letters[start : start + _BUILD_CHUNK_SIZE]
+        matrix[start : start + len(chunk)] = _pattern_chunk(chunk, answer_letters)
+
+    return matrix
+
+
+def _pattern_chunk(guess_letters: np.ndarray, answer_letters: np.ndarray) -> np.ndarray:
+    """Compute pattern codes for a chunk of guesses against every answer."""
+    # greens[g, a, i]: guess g matches answer a at position i
+    greens = guess_letters[:, None, :] == answer_letters[None, :, :]
+    # Answer letters left once greens are consumed (0 never matches a letter)
+    leftover = np.where(greens, 0, answer_letters[None, :, :])
+    codes = np.zeros(greens.shape[:2], dtype=PATTERN_DTYPE)
+
+    for i in range(5):
+        letter = guess_letters[:, i][:, None]
+
+        # Unconsumed copies of this letter in the answer
+        available = np.zeros(codes.shape, dtype=np.uint8)
+        for j in range(5):
+            available += (leftover[:, :, j] == letter).view(np.uint8)
+
+        # Copies already claimed as yellows by earlier non-green guess letters
+        claimed = np.zeros(codes.shape, dtype=np.uint8)
+        for k in range(i):
+            repeated = (guess_letters[:, k] == guess_letters[:, i])[:, None]
+            claimed += (repeated & ~greens[:, :, k]).view(np.uint8)
+
+        digit = np.where(greens[:, :, i], 1, np.where(available > claimed, 2, 0))
+        codes += (digit * _PLACE_VALUES[i]).astype(PATTERN_DTYPE)
+
+    return codes
+
+
+def wordlist_hash(words: Sequence[str]) -> str:
+    """Return a short content hash identifying a wordlist."""
+    return hashlib.sha256("\n".join(words).encode("ascii")).hexdigest()[:16]
+
+
+def pattern_matrix_path(
+    words: Sequence[str], directory: Path = PATTERN_CACHE_DIR
+) -> Path:
+    """Return where the persisted pattern matrix for a wordlist lives."""
+    return directory / f"patterns-v{MATRIX_FORMAT_VERSION}-{wordlist_hash(words)}.npy"
+
+
+def save_pattern_matrix(matrix: np.ndarray, path: Path) -> None:
+    """Atomically write a pattern matrix so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_pattern_matrix(
+    words: Sequence[str], directory: Path = PATTERN_CACHE_DIR
+) -> np.ndarray:
+    """
+    Memory-map the persisted pattern matrix for a wordlist read-only,
+    building and persisting it first if it is missing or stale.
+
+    Falls back to an in-memory matrix if the cache directory is not writable.
+    """
+    path = pattern_matrix_path(words, directory)
+    shape = (len(words), len(words))
+
+    if path.exists():
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.shape == shape and matrix.dtype == PATTERN_DTYPE:
+                return matrix
+        except ValueError:
+            pass
+
+    matrix = build_pattern_matrix(words, words)
+    try:
+        save_pattern_matrix(matrix, path)
+    except OSError:
+        matrix.flags.writeable = False
+        return matrix
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,90 @@
+from typing import Callable
+
+import numpy as np
+
+from .engine import WordEngine
+from .patterns import PATTERN_COUNT, SOLVED_PATTERN
+
+# Partitions are only compared when there are at most this many answers,
+# since comparing them costs about as much as scoring every guess
+DISTINCT_PARTITION_MAX_ANSWERS = 128
+
+# Takes the engine, candidate guesses and remaining answers (wordlist
+# indices) and returns the guesses worth scoring, in their original order
+GuessPoolFilter = Callable[[WordEngine, np.ndarray, np.ndarray], np.ndarray]
+
+
+def informative_guesses(
+    engine: WordEngine, guesses: np.ndarray, possible_answers: np.ndarray
+) -> np.ndarray:
+    """
+    Drop guesses that get the same feedback from every remaining answer.
+
+    A guess's feedback is fixed by which of its letters are green and, for
+    each letter, how many copies the answer has up to the guess's count. So
+    a guess tells nothing new when every answer agrees on all of those,
+    e.g. when all its letters are already known grey.
+    """
+    answer_letters = engine.letters[possible_answers]
+    answer_counts = engine.letter_counts[possible_answers]
+
+    # Letters present at each position in any / every remaining answer
+    present = np.zeros((len(possible_answers), 5, 26), dtype=bool)
+    answer_rows = np.arange(len(possible_answers))[:, None]
+    present[answer_rows, np.arange(5), answer_letters] = True
+    in_any = present.any(axis=0)
+    in_all = present.all(axis=0)
+
+    guess_letters = engine.letters[guesses]
+    green_varies = (
+        in_any[np.arange(5), guess_letters] != in_all[np.arange(5), guess_letters]
+    ).any(axis=1)
+
+    guess_counts = engine.letter_counts[guesses]
+    fewest = np.minimum(answer_counts.min(axis=0), guess_counts)
+    most = np.minimum(answer_counts.max(axis=0), guess_counts)
+    count_varies = (fewest != most).any(axis=1)
+
+    return guesses[green_varies | count_varies]
+
+
+def distinct_partitions(
+    engine: WordEngine, guesses: np.ndarray, possible_answers: np.ndarray
+) -> np.ndarray:
+    """
+    Keep one guess per partition of the remaining answers, the first.
+
+    Guesses splitting the answers into the same groups, with the same answer
+    solved outright, score identically under every strategy. Only safe where
+    just the best score matters: the guesses dropped could still have been
+    among the top n suggested.
+    """
+    if len(possible_answers) > DISTINCT_PARTITION_MAX_ANSWERS:
+        return guesses
+
+    rows = engine.patterns[np.ix_(guesses, possible_answers)]
+
+    # Relabel each answer by the first answer sharing its pattern, so
+    # equal partitions give equal rows whatever the patterns themselves
+    first = np.empty((len(guesses), PATTERN_COUNT), dtype=np.int16)
+    guess_rows = np.arange(len(guesses))
+    for column in range(len(possible_answers) - 1, -1, -1):
+        first[guess_rows, rows[:, column]] = column
+    labels = np.take_along_axis(first, rows.astype(np.intp), axis=1)
+    labels[rows == SOLVED_PATTERN] = -1
+
+    keys = np.ascontiguousarray(labels).view(
+        np.dtype((np.void, labels.dtype.itemsize * labels.shape[1]))
+    )
+    _, kept = np.unique(keys.ravel(), return_index=True)
+    return guesses[np.sort(kept)]
+
+
+DEFAULT_GUESS_POOL_FILTERS: tuple[GuessPoolFilter, ...] = (informative_guesses,)
+
+# Within a search only the best score of each position is used, so guesses
+# tying with one already kept can go too
+SEARCH_GUESS_POOL_FILTERS: tuple[GuessPoolFilter, ...] = (
+    informative_guesses,
+    distinct_partitions,
+)
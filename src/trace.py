@@ -0,0 +1,86 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, ContextManager, Iterator, Optional
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+class Trace:
+    """
+    Phase timings and counters collected while handling one request.
+
+    Spans with the same name accumulate, so a phase entered many times
+    reports its total time.
+    """
+
+    def __init__(self) -> None:
+        self.spans_ms: dict[str, float] = {}
+        self.counters: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.spans_ms[name] = self.spans_ms.get(name, 0.0) + elapsed_ms
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other: dict[str, Any]) -> None:
+        """Add a trace recorded elsewhere, e.g. in a worker process."""
+        for name, elapsed_ms in other["spans_ms"].items():
+            self.spans_ms[name] = self.spans_ms.get(name, 0.0) + elapsed_ms
+        for name, value in other["counters"].items():
+            self.count(name, value)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "spans_ms": {name: round(ms, 2) for name, ms in self.spans_ms.items()},
+            "counters": dict(self.counters),
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_NO_SPAN = nullcontext()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def tracing(enabled: bool = TRACE_ENABLED) -> Iterator[Optional[Trace]]:
+    """
+    Collect spans and counters recorded in this context into a new Trace.
+    Yields None, and records nothing, when disabled.
+    """
+    if not enabled:
+        yield None
+        return
+
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def span(name: str) -> ContextManager[None]:
+    """Time a phase into the current trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add to a counter in the current trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, value)
@@ -0,0 +1,291 @@
+"""
+Webhook serving mode: a front process receives updates from Telegram and
+hands each to one of several bot worker processes.
+
+Every update from a (user_id, chat_id) pair goes to the same worker, so a
+session is only ever used by one process. The front listens for plain
+HTTP on WEBHOOK_LISTEN:WEBHOOK_PORT; Telegram must reach it at
+WEBHOOK_URL, usually through a TLS-terminating reverse proxy.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import time
+import zlib
+from http import HTTPStatus
+from multiprocessing.queues import Queue
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from telegram import Bot, Update
+from telegram.ext import Application
+
+from src.executor import STRATEGY_WORKERS, executor
+from src.logging import logger
+from src.metrics import METRICS_PORT, start_metrics_server
+from src.session import strategies
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL") or ""
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN") or "0.0.0.0"
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT") or 8080)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+BOT_WORKERS = int(os.getenv("BOT_WORKERS") or os.cpu_count() or 1)
+# Seconds bot workers get to finish their updates on shutdown before being
+# terminated; keep it under the container's stop grace period
+WEBHOOK_STOP_TIMEOUT = float(os.getenv("WEBHOOK_STOP_TIMEOUT") or 8)
+
+# Telegram updates are small; anything bigger isn't one
+_MAX_BODY_SIZE = 1 << 20
+# How often the front checks that every bot worker is still alive
+_WORKER_CHECK_SECONDS = 1.0
+# A worker dying sooner than this after starting is crashing on startup,
+# so restarting it would only loop
+_WORKER_MIN_UPTIME_SECONDS = 30.0
+
+ApplicationFactory = Callable[[str, bool], Application]
+
+
+def worker_for(update: Update, workers: int) -> int:
+    """Pick the worker that owns an update's (user_id, chat_id) session."""
+    user_id = update.effective_user.id if update.effective_user else 0
+    chat_id = update.effective_chat.id if update.effective_chat else 0
+    return zlib.crc32(f"{user_id}:{chat_id}".encode()) % workers
+
+
+def _run_worker(
+    index: int,
+    updates: Queue,
+    build_application: ApplicationFactory,
+    bot_token: str,
+    strategy_workers: int,
+) -> None:
+    # The front process decides when to stop, by queueing None
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(
+        _serve_worker(index, updates, build_application, bot_token, strategy_workers)
+    )
+
+
+async def _serve_worker(
+    index: int,
+    updates: Queue,
+    build_application: ApplicationFactory,
+    bot_token: str,
+    strategy_workers: int,
+) -> None:
+    executor.workers = strategy_workers
+    executor.start(list(strategies.values()))
+    if METRICS_PORT is not None:
+        start_metrics_server(METRICS_PORT + 1 + index)
+
+    application = build_application(bot_token, False)
+    loop = asyncio.get_running_loop()
+    try:
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+
+        while (data := await loop.run_in_executor(None, updates.get)) is not None:
+            await application.update_queue.put(Update.de_json(data, application.bot))
+
+        # Handles every update already queued before stopping
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+    finally:
+        executor.shutdown()
+
+
+class _Front:
+    """Receives webhook requests and queues each update for its worker."""
+
+    def __init__(self, queues: list[Queue], path: str, secret: Optional[str]):
+        self.queues = queues
+        self.path = path
+        self.secret = secret
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            status = await self._respond(reader)
+        except (ValueError, asyncio.IncompleteReadError):
+            status = 400
+        except Exception as e:
+            logger.error("webhook_failed", error_type=type(e).__name__)
+            status = 500
+
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Length: 0\r\nConnection: close\r\n\r\n".encode()
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(self, reader: asyncio.StreamReader) -> int:
+        request_line = (await reader.readline()).decode("latin-1")
+        method, path, _ = request_line.split(" ", 2)
+
+        headers: dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > _MAX_BODY_SIZE:
+            return 413
+        body = await reader.readexactly(length)
+
+        if method != "POST" or path != self.path:
+            return 404
+        if (
+            self.secret is not None
+            and headers.get("x-telegram-bot-api-secret-token") != self.secret
+        ):
+            return 403
+
+        data = json.loads(body)
+        update = Update.de_json(data, None)
+        self.queues[worker_for(update, len(self.queues))].put(data)
+        return 200
+
+
+class _Workers:
+    """Starts the bot worker processes and restarts any that die."""
+
+    def __init__(
+        self,
+        queues: list[Queue],
+        build_application: ApplicationFactory,
+        bot_token: str,
+        strategy_workers: int,
+    ):
+        self.queues = queues
+        self.build_application = build_application
+        self.bot_token = bot_token
+        self.strategy_workers = strategy_workers
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: list[multiprocessing.process.BaseProcess] = []
+        self.started: list[float] = []
+
+    def start(self) -> None:
+        for index in range(len(self.queues)):
+            self.processes.append(self._start(index))
+            self.started.append(time.monotonic())
+
+    def _start(self, index: int) -> multiprocessing.process.BaseProcess:
+        process = self.context.Process(
+            target=_run_worker,
+            args=(
+                index,
+                self.queues[index],
+                self.build_application,
+                self.bot_token,
+                self.strategy_workers,
+            ),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        return process
+
+    async def watch(self, stopping: asyncio.Event) -> None:
+        """
+        Restart any worker that dies, on the same queue so the updates it
+        hadn't taken yet aren't lost. Sets stopping instead if a worker
+        dies right after starting, as a fresh one would die the same way.
+        """
+        while not stopping.is_set():
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                uptime = time.monotonic() - self.started[index]
+                logger.error(
+                    "bot_worker_died",
+                    worker=index,
+                    exitcode=process.exitcode,
+                    uptime_seconds=round(uptime, 1),
+                )
+                if uptime < _WORKER_MIN_UPTIME_SECONDS:
+                    stopping.set()
+                    return
+                self.processes[index] = self._start(index)
+                self.started[index] = time.monotonic()
+            try:
+                await asyncio.wait_for(stopping.wait(), _WORKER_CHECK_SECONDS)
+            except TimeoutError:
+                pass
+
+    def stop(self, timeout: float = WEBHOOK_STOP_TIMEOUT) -> None:
+        """
+        Let every worker finish its queued updates, waiting up to timeout
+        seconds overall, then terminate any still running.
+        """
+        for queue in self.queues:
+            queue.put(None)
+        deadline = time.monotonic() + timeout
+        for index, process in enumerate(self.processes):
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error("bot_worker_terminated", worker=index, timeout=timeout)
+                process.terminate()
+                process.join()
+
+
+async def _serve_front(bot_token: str, workers: _Workers) -> None:
+    # Installed first, so a signal during startup still stops the workers
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    front = _Front(workers.queues, urlsplit(WEBHOOK_URL).path or "/", WEBHOOK_SECRET)
+    server = await asyncio.start_server(front.handle, WEBHOOK_LISTEN, WEBHOOK_PORT)
+
+    async with server:
+        async with Bot(bot_token) as bot:
+            await bot.set_webhook(
+                WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+            )
+        await workers.watch(stopping)
+
+
+def serve_webhook(
+    bot_token: str,
+    build_application: ApplicationFactory,
+    workers: int = BOT_WORKERS,
+) -> None:
+    """
+    Serve the bot over a webhook with a front process and bot workers,
+    until SIGINT or SIGTERM. Workers finish the updates they were handed
+    before exiting; one that dies is restarted.
+
+    Args:
+        bot_token: Telegram bot token
+        build_application: Builds a worker's Application from the token and
+            whether it should have an updater (it shouldn't)
+        workers: Number of bot worker processes
+    """
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL must be set to serve over a webhook")
+
+    context = multiprocessing.get_context("spawn")
+    queues: list[Queue] = [context.Queue() for _ in range(workers)]
+    # Strategy worker pools split the cores between bot workers
+    strategy_workers = max(1, STRATEGY_WORKERS // workers)
+    bot_workers = _Workers(queues, build_application, bot_token, strategy_workers)
+
+    try:
+        bot_workers.start()
+        asyncio.run(_serve_front(bot_token, bot_workers))
+    finally:
+        bot_workers.stop()